@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Backfill (--backfill) contra o mock SERP, que serve janelas date= de uma
+série latente fixa por termo (benchmarks/mock_serp.latente).
+
+Mede por execução: blocos, chamadas SERP, tempo e o tempo projetado no rate
+limit de produção; confere a costura (razão série costurada / latente deve
+ser constante: coeficiente de variação baixo) e a retomada (segunda execução
+sem nenhuma chamada).
+
+Uso:
+    python benchmarks/bench_backfill.py
+    python benchmarks/bench_backfill.py --anos 5 --destinos gramado-canela
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.join(AQUI, '..')
+sys.path.insert(0, AQUI)
+
+import mock_serp
+
+SERP_RPS_PRODUCAO = 0.5
+
+def executar(pulse, intervalo: str, ids):
+    inicio_serp = pulse.TELEMETRIA.contadores.get('serp_requests', 0)
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        pulse.main_backfill(intervalo, ids)
+    return pulse.TELEMETRIA.contadores.get('serp_requests', 0) - inicio_serp, time.perf_counter() - inicio
+
+def erro_costura(pulse, destinos) -> dict:
+    """Coeficiente de variação (%) de costurada / latente por destino."""
+    import numpy as np
+    historico = pulse.HistoryStore()
+    erros = {}
+    for destino in destinos:
+        pontos, valores = historico.serie(destino['id'])
+        if not len(pontos):
+            continue
+        latentes = np.array([sum(mock_serp.latente(kw, int(t)) for kw in destino['keywords']) for t in pontos])
+        razao = valores / latentes
+        erros[destino['id']] = (len(pontos), 100 * razao.std() / razao.mean())
+    return erros
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--anos', type=int, default=5)
+    parser.add_argument('--destinos', help='ids separados por vírgula (padrão: todos de destinos.json)')
+    parser.add_argument('--limite-cv', type=float, default=5.0, help='CV máximo aceito na costura (%%)')
+    mock_serp.argumentos(parser)
+    parser.set_defaults(latencia_ms=0, jitter_ms=0, padding_kb=0)
+    args = parser.parse_args()
+
+    mock = mock_serp.criar(args)
+    url = mock.iniciar()
+    trabalho = tempfile.mkdtemp(prefix='pulse-backfill-')
+    os.environ.update({
+        "BRIGHT_DATA_ENDPOINT": f"{url}/",
+        "PULSE_CACHE_DIR": "",
+        "PULSE_TELEMETRIA": "",
+        "PULSE_ARQUIVO_DIR": "",
+        "PULSE_SERP_RPS": "1000",
+        "PULSE_SERP_BURST": "1000",
+        "PULSE_BACKFILL_DIR": os.path.join(trabalho, 'backfill'),
+        "PULSE_HISTORY_DIR": os.path.join(trabalho, 'historico'),
+    })
+
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import update_pulse_v2 as pulse
+
+    ids = [i for i in (args.destinos or '').split(',') if i] or None
+    destinos = [d for d in pulse.DESTINOS if not ids or d['id'] in ids]
+    hoje = pulse.datetime.now()
+    intervalo = f"{hoje.replace(year=hoje.year - args.anos):%Y-%m-%d}:"
+    try:
+        chamadas, tempo = executar(pulse, intervalo, ids)
+        chamadas_retomada, _ = executar(pulse, intervalo, ids)
+        erros = erro_costura(pulse, destinos)
+    finally:
+        mock.parar()
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    print(f"{len(destinos)} destinos, {args.anos} anos: {chamadas} chamadas SERP em {tempo:.1f}s "
+          f"(produção a {SERP_RPS_PRODUCAO} req/s ≈ {chamadas / SERP_RPS_PRODUCAO / 60:.1f} min)")
+    print(f"{'destino':>18}  {'pontos':>6}  {'CV (%)':>6}")
+    for destino_id, (pontos, cv) in erros.items():
+        print(f"{destino_id:>18}  {pontos:>6}  {cv:>6.2f}")
+
+    if chamadas_retomada:
+        sys.exit(f"retomada refez {chamadas_retomada} chamadas (esperado 0)")
+    ruins = [i for i, (_, cv) in erros.items() if cv > args.limite_cv]
+    if len(erros) < len(destinos) or ruins:
+        sys.exit(f"costura fora do limite ({args.limite_cv}%): {ruins or 'destinos sem histórico'}")
+    print("retomada sem chamadas, costura ok")
+
+if __name__ == "__main__":
+    main()
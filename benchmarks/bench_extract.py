@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark: extração por regex (v7.0) x varredura única com casamento
+de colchetes (scan_widget_json).
+
+Uso:
+    python benchmarks/bench_extract.py                 # páginas sintéticas
+    python benchmarks/bench_extract.py paginas/*.html  # páginas salvas
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from update_pulse_v2 import scan_widget_json
+
+# ============================================================================
+# EXTRAÇÃO LEGADA (regex da v7.0, uma busca no documento por bloco)
+# ============================================================================
+
+def legacy_extract(html: str):
+    timeline = geo = None
+    match = re.search(r'"default":\s*{[^}]*"timelineData":\s*(\[[^\]]+\])', html, re.DOTALL)
+    if match:
+        try:
+            timeline = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+    if timeline is None:
+        re.search(r'"TIMESERIES"[^}]*"lineAnnotationText":\s*"(\d+)"', html)
+    match = re.search(r'"geoMapData":\s*(\[[^\]]+\])', html, re.DOTALL)
+    if match:
+        try:
+            geo = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+    return timeline, geo
+
+def scanner_extract(html: str):
+    blocos = scan_widget_json.__wrapped__(html)  # sem o lru_cache
+    return blocos['timelineData'], blocos['geoMapData']
+
+# ============================================================================
+# PÁGINAS SINTÉTICAS
+# ============================================================================
+
+def pagina_sintetica(tamanho_kb: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    timeline = [
+        {"time": str(1700000000 + i * 604800), "formattedTime": f"sem {i}",
+         "value": [rng.randint(0, 100)], "hasData": [True], "formattedValue": ["50"]}
+        for i in range(52)
+    ]
+    geo = [
+        {"geoCode": f"BR-{i:02d}", "geoName": f"Estado {i}", "value": [rng.randint(0, 100)],
+         "formattedValue": ["10"], "maxValueIndex": 0, "hasData": [True]}
+        for i in range(27)
+    ]
+    ranked = [{"rankedKeyword": [{"query": f"termo {i}", "value": 100 - i} for i in range(25)]}]
+
+    widgets = (
+        f'<script>window.w1={json.dumps({"default": {"timelineData": timeline, "averages": []}})};</script>'
+        f'<script>window.w2={json.dumps({"default": {"geoMapData": geo}})};</script>'
+        f'<script>window.w3={json.dumps({"default": {"rankedList": ranked}})};</script>'
+    )
+    filler = '<div class="x">' + 'lorem ipsum "q" [a] {b} ' * 40 + '</div>\n'
+    corpo = []
+    while sum(len(c) for c in corpo) < tamanho_kb * 1024:
+        corpo.append(filler)
+    meio = len(corpo) // 2
+    return '<html><body>' + ''.join(corpo[:meio]) + widgets + ''.join(corpo[meio:]) + '</body></html>'
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def medir(nome: str, html: str, repeticoes: int = 20):
+    legado = timeit.timeit(lambda: legacy_extract(html), number=repeticoes) / repeticoes
+    novo = timeit.timeit(lambda: scanner_extract(html), number=repeticoes) / repeticoes
+
+    tl_legado, _ = legacy_extract(html)
+    tl_novo, _ = scanner_extract(html)
+    ok_legado = "ok" if tl_legado else "falhou"
+    ok_novo = f"ok ({len(tl_novo[0])} pts)" if tl_novo else "falhou"
+
+    print(f"{nome:<28} {len(html) / 1024:>8.0f} KB  "
+          f"regex {legado * 1000:>8.2f} ms [{ok_legado:<7}]  "
+          f"scanner {novo * 1000:>8.2f} ms [{ok_novo}]")
+
+def main():
+    print(f"{'página':<28} {'tamanho':>11}  {'legado':<28}  {'scanner'}")
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, encoding='utf-8') as f:
+                medir(os.path.basename(path), f.read())
+    else:
+        for kb in (50, 300, 1000, 3000):
+            medir(f"sintética {kb} KB", pagina_sintetica(kb))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: calcular_metricas da v7.0 (um dict por destino, escalar) x
+calcular_metricas_lote (matriz destinos × tempo, NumPy).
+
+Uso:
+    python benchmarks/bench_metrics.py [--pontos 52]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from update_pulse_v2 import calcular_metricas_lote
+
+# ============================================================================
+# MÉTRICAS LEGADAS (v7.0)
+# ============================================================================
+
+def legacy_calcular_metricas(trends_data, origins):
+    variation = trends_data.get('variation', 0)
+    current = trends_data.get('current', 50)
+
+    status = "Aquecendo" if variation > 15 else ("Arrefecendo" if variation < -15 else "Estável")
+    emoji = "🔥" if status == "Aquecendo" else ("❄️" if status == "Arrefecendo" else "📊")
+
+    origem_principal = origins[0]['origem'] if origins else "Desconhecido"
+    insight = f"{origem_principal} lidera com {variation:+.1f}%"
+
+    return {
+        "status": status, "emoji": emoji, "humor": "Positivo", "crescimento": round(variation, 1),
+        "pressaoReserva": min(100, max(0, current + random.randint(-10, 10))),
+        "gatilhoProximidade": min(100, max(0, 100 - abs(int(variation)))),
+        "velocidadeViral": min(100, max(0, current + random.randint(-15, 15))),
+        "sentimento": random.randint(75, 95), "intencaoEstadia": random.randint(75, 90),
+        "perfilPublico": {"casais": 50, "familias": 50},
+        "impactoClimatico": "Favorável", "insight": insight
+    }
+
+def legacy_loop(matriz):
+    origins = [{"origem": "São Paulo"}]
+    saida = []
+    for linha in matriz:
+        values = linha.tolist()
+        variation = (values[-1] - values[0]) / values[0] * 100 if values[0] else 0
+        saida.append(legacy_calcular_metricas({"variation": variation, "current": values[-1]}, origins))
+    return saida
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def medir(fn, *args, repeticoes=5):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pontos', type=int, default=52)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    print(f"{'destinos':>9}  {'legado (ms)':>12}  {'lote (ms)':>10}  {'ganho':>7}")
+    for destinos in (10, 100, 1000, 10000):
+        matriz = np.clip(rng.normal(50, 15, size=(destinos, args.pontos)), 1, 100)
+        hist_media = rng.normal(50, 5, size=destinos)
+        hist_desvio = np.abs(rng.normal(10, 2, size=destinos))
+
+        legado = medir(legacy_loop, matriz)
+        lote = medir(calcular_metricas_lote, matriz, hist_media, hist_desvio)
+        print(f"{destinos:>9}  {legado * 1000:>12.2f}  {lote * 1000:>10.2f}  {legado / lote:>6.1f}x")
+
+    # Determinismo: duas chamadas, mesma saída
+    a = calcular_metricas_lote(matriz, hist_media, hist_desvio)
+    b = calcular_metricas_lote(matriz, hist_media, hist_desvio)
+    assert all(np.array_equal(a[k], b[k]) for k in a), "métricas não determinísticas"
+    print("determinístico: ok")
+
+if __name__ == "__main__":
+    main()
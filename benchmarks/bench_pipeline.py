@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark ponta a ponta do pipeline contra o mock SERP (benchmarks/mock_serp.py),
+sem rede nem saldo Bright Data.
+
+Para cada tamanho (10/100/1000 destinos sintéticos) roda main() num processo
+limpo, em diretório temporário, e mede:
+    - tempo total e throughput (destinos/s)
+    - requisições SERP e Open-Meteo por destino
+    - pico de memória (ru_maxrss)
+    - p50/p95/total por etapa (fetch, parse, metrics, publish) via telemetria
+
+Uso:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --tamanhos 10 100 --latencia-ms 300 --taxa-429 0.02
+    python benchmarks/bench_pipeline.py --salvar base.json            # grava baseline
+    python benchmarks/bench_pipeline.py --comparar base.json          # sai com 1 se regrediu
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+import contextlib
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.join(AQUI, '..')
+sys.path.insert(0, AQUI)
+
+import mock_serp
+
+# Métricas comparadas com a baseline (maior = pior)
+METRICAS_REGRESSAO = ("tempo_s", "serp_por_destino", "meteo_por_destino", "pico_mb")
+
+# ============================================================================
+# PROCESSO FILHO (uma execução de main())
+# ============================================================================
+
+def destinos_sinteticos(n: int):
+    return [
+        {
+            "id": f"destino-{i:04d}",
+            "nome": f"Destino {i:04d}",
+            "keywords": [f"Destino {i:04d}"],
+            "estado": "SP",
+            "regiao": "Sintética",
+            "lat": round(-30 + (i % 150) * 0.1, 2),
+            "lon": round(-55 + (i // 150) * 0.1, 2)
+        }
+        for i in range(n)
+    ]
+
+def executar_filho(n: int) -> dict:
+    """Roda main() com o ambiente já apontado para o mock (ver executar_tamanho)."""
+    with open('destinos.json', 'w', encoding='utf-8') as f:
+        json.dump(destinos_sinteticos(n), f, ensure_ascii=False)
+
+    sys.path.insert(0, RAIZ)
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        import update_pulse_v2 as pulse
+        pulse.main()
+    tempo = time.perf_counter() - inicio
+
+    resumo = pulse.TELEMETRIA.resumo()
+    return {
+        "destinos": n,
+        "tempo_s": round(tempo, 3),
+        "throughput": round(n / tempo, 2),
+        "serp_calls": resumo['serp_calls'],
+        "pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "etapas": resumo['etapas']
+    }
+
+# ============================================================================
+# ORQUESTRAÇÃO
+# ============================================================================
+
+def executar_tamanho(n: int, url: str, args) -> dict:
+    trabalho = tempfile.mkdtemp(prefix=f'pulse-bench-{n}-')
+    env = {
+        **os.environ,
+        "BRIGHT_DATA_ENDPOINT": f"{url}/",
+        "OPEN_METEO_ENDPOINT": f"{url}/v1/forecast",
+        "PULSE_SERP_RPS": str(args.serp_rps),
+        "PULSE_SERP_BURST": str(args.serp_rps),
+        "PULSE_METEO_RPS": "1000",
+        "PULSE_METEO_BURST": "1000",
+        "PULSE_CACHE_DIR": "",
+        "PULSE_TELEMETRIA": os.path.join(trabalho, 'telemetria.jsonl'),
+    }
+    # Armazenamento remoto fora do benchmark
+    for chave in ("SUPABASE_URL", "SUPABASE_KEY", "PULSE_STORAGE"):
+        env.pop(chave, None)
+
+    try:
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho', str(n)],
+            cwd=trabalho, env=env, capture_output=True, text=True, check=True
+        )
+    except subprocess.CalledProcessError as e:
+        raise SystemExit(f"execução com {n} destinos falhou:\n{e.stderr[-2000:]}")
+    finally:
+        shutil.rmtree(trabalho, ignore_errors=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> bool:
+    """Imprime a variação por métrica; True se alguma passou da tolerância."""
+    regrediu = False
+    print(f"\nComparação com baseline (tolerância {tolerancia:.0%}):")
+    for tamanho, linha in atual.items():
+        base = baseline.get(tamanho)
+        if not base:
+            continue
+        for metrica in METRICAS_REGRESSAO:
+            antes, depois = base.get(metrica), linha.get(metrica)
+            if not antes or depois is None:
+                continue
+            delta = (depois - antes) / antes
+            marca = "REGRESSÃO" if delta > tolerancia else ""
+            regrediu |= bool(marca)
+            print(f"  {tamanho:>5} {metrica:<18} {antes:>10.3f} → {depois:>10.3f}  {delta:+7.1%} {marca}")
+    return regrediu
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filho', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--serp-rps', type=float, default=1000,
+                        help='rate limit SERP durante o benchmark (produção: 0.5)')
+    parser.add_argument('--salvar', help='grava o resultado como baseline JSON')
+    parser.add_argument('--comparar', help='baseline JSON para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    mock_serp.argumentos(parser)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(executar_filho(args.filho)))
+        return
+
+    mock = mock_serp.criar(args)
+    url = mock.iniciar()
+    print(f"mock: latência {args.latencia_ms:.0f}±{args.jitter_ms:.0f} ms, 429 {args.taxa_429:.0%}, "
+          f"timeout {args.taxa_timeout:.0%}, página +{args.padding_kb} KB")
+    print(f"{'destinos':>9}  {'tempo (s)':>10}  {'dest/s':>8}  {'serp/dest':>9}  {'meteo/dest':>10}  {'pico (MB)':>9}  etapas (total s)")
+
+    resultados = {}
+    try:
+        for n in args.tamanhos:
+            antes = dict(mock.stats)
+            linha = executar_tamanho(n, url, args)
+            linha['serp_por_destino'] = round((mock.stats['serp'] - antes['serp']) / n, 4)
+            linha['meteo_por_destino'] = round((mock.stats['meteo'] - antes['meteo']) / n, 4)
+            linha['respostas_429'] = mock.stats['429'] - antes['429']
+            linha['timeouts'] = mock.stats['timeout'] - antes['timeout']
+            resultados[str(n)] = linha
+
+            etapas = "  ".join(f"{e}={v['total_ms'] / 1000:.2f}" for e, v in sorted(linha['etapas'].items()))
+            print(f"{n:>9}  {linha['tempo_s']:>10.2f}  {linha['throughput']:>8.1f}  {linha['serp_por_destino']:>9.3f}  "
+                  f"{linha['meteo_por_destino']:>10.3f}  {linha['pico_mb']:>9.1f}  {etapas}")
+    finally:
+        mock.parar()
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump({"parametros": {k: v for k, v in vars(args).items() if k not in ('filho', 'salvar', 'comparar')},
+                       "resultados": resultados}, f, indent=2)
+        print(f"\nbaseline gravada em {args.salvar}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['resultados']
+        if comparar(resultados, baseline, args.tolerancia):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
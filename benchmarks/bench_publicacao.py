@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Publicação estática: tamanho e tempo de parse do backup inteiro
+(pulse-data-backup.json) contra o índice e o shard médio do snapshot
+gerado por publicar_snapshot a partir dele.
+
+Uso:
+    python benchmarks/bench_publicacao.py [--backup pulse-data-backup.json] [--repeticoes 20]
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+
+from update_pulse_v2 import publicar_snapshot
+
+def medir(path: str, repeticoes: int) -> tuple:
+    """(bytes, bytes gzip -9, ms de json.loads) de um arquivo."""
+    with open(path, 'rb') as f:
+        conteudo = f.read()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        json.loads(conteudo)
+    parse_ms = (time.perf_counter() - inicio) / repeticoes * 1000
+    return len(conteudo), len(gzip.compress(conteudo, 9)), parse_ms
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backup', default=os.path.join(RAIZ, 'pulse-data-backup.json'))
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.backup, 'r', encoding='utf-8') as f:
+        final_data = list(json.load(f).values())
+    ranking = [d['id'] for d in sorted(final_data, key=lambda d: d.get('crescimento', 0), reverse=True)[:3]]
+
+    diretorio = tempfile.mkdtemp(prefix='pulse-publicacao-')
+    try:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            publicado = publicar_snapshot(final_data, ranking, diretorio)
+        backup = medir(args.backup, args.repeticoes)
+        indice = medir(publicado['index'], args.repeticoes)
+        shards = [medir(p, args.repeticoes) for p in publicado['shards']] or [(0, 0, 0)]
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    shard_medio = tuple(sum(v) / len(shards) for v in zip(*shards))
+
+    print(f"{len(final_data)} destinos (bytes | gzip | parse):")
+    for nome, (bruto, gz, parse_ms) in (("backup", backup), ("índice", indice), ("shard médio", shard_medio)):
+        print(f"   {nome:<12} {bruto:>9.0f} B | {gz:>8.0f} B | {parse_ms:.3f} ms")
+
+if __name__ == "__main__":
+    main()
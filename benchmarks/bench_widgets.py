@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Widgets JSON (api/explore + widgetdata/multiline + comparedgeo) x página do
+explore, offline, com as fixtures de benchmarks/fixtures servidas pelo mock SERP.
+
+As fixtures versionadas são SINTÉTICAS: gravadas (--gravar) a partir do
+próprio mock, não do Google. Medem chamadas/bytes/parse e a paridade entre os
+dois caminhos no formato que o mock reproduz; não provam que o parser aceita
+respostas reais do Trends.
+
+Compara por modo: chamadas SERP, bytes transferidos, tempo de coleta e de
+parse — e confere que os dois caminhos dão as mesmas séries (origens não
+saem dos lotes, ver update_pulse_v2.geo_termo).
+
+Uso:
+    python benchmarks/bench_widgets.py                # replay das fixtures
+    python benchmarks/bench_widgets.py --gravar       # regrava (sintéticas) a partir do mock
+
+Fixtures reais (consome saldo; substituem as sintéticas): rode o pipeline com
+    PULSE_GRAVAR_FIXTURES=benchmarks/fixtures PULSE_FETCH_MODE=widget
+e depois com PULSE_FETCH_MODE=html.
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.join(AQUI, '..')
+FIXTURES = os.path.join(AQUI, 'fixtures')
+sys.path.insert(0, AQUI)
+
+import mock_serp
+
+def coletar_modo(pulse, modo: str, grupos):
+    """Roda todos os grupos no modo; devolve as comparações e os spans gerados."""
+    pulse.FETCH_MODE = modo
+    pulse.RESPONSE_CACHE._memo.clear()
+    inicio_spans = len(pulse.TELEMETRIA.spans)
+    inicio_serp = pulse.TELEMETRIA.contadores.get('serp_requests', 0)
+
+    inicio = time.perf_counter()
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        comparacoes = [pulse.fetch_comparacao(g) for g in grupos]
+    tempo = time.perf_counter() - inicio
+
+    spans = pulse.TELEMETRIA.spans[inicio_spans:]
+    return comparacoes, {
+        "chamadas": pulse.TELEMETRIA.contadores.get('serp_requests', 0) - inicio_serp,
+        "bytes": sum(s.get('bytes', 0) for s in spans if s['etapa'] == 'fetch'),
+        "tempo_s": tempo,
+        "parse_ms": sum(s['latencia_ms'] for s in spans if s['etapa'] == 'parse'),
+        "fontes": sorted({s.get('fonte') for s in spans if s['etapa'] == 'parse'})
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--gravar', action='store_true', help='regrava benchmarks/fixtures (sintéticas) a partir do mock')
+    mock_serp.argumentos(parser)
+    parser.set_defaults(latencia_ms=0, jitter_ms=0)
+    args = parser.parse_args()
+    args.fixtures = None if args.gravar else (args.fixtures or FIXTURES)
+
+    mock = mock_serp.criar(args)
+    url = mock.iniciar()
+    os.environ.update({
+        "BRIGHT_DATA_ENDPOINT": f"{url}/",
+        "PULSE_CACHE_DIR": "",
+        "PULSE_TELEMETRIA": "",
+        "PULSE_ARQUIVO_DIR": "",
+        "PULSE_SERP_RPS": "1000",
+        "PULSE_SERP_BURST": "1000",
+    })
+    if args.gravar:
+        os.environ["PULSE_GRAVAR_FIXTURES"] = FIXTURES
+
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import update_pulse_v2 as pulse
+
+    grupos = pulse.planejar_lotes(pulse.DESTINOS)
+    try:
+        html, m_html = coletar_modo(pulse, 'html', grupos)
+        widget, m_widget = coletar_modo(pulse, 'widget', grupos)
+    finally:
+        mock.parar()
+
+    print(f"{len(grupos)} comparações ({len(pulse.DESTINOS)} destinos)")
+    print(f"{'modo':>7}  {'chamadas':>8}  {'bytes':>10}  {'coleta (ms)':>11}  {'parse (ms)':>10}  fonte")
+    for modo, m in (('html', m_html), ('widget', m_widget)):
+        print(f"{modo:>7}  {m['chamadas']:>8}  {m['bytes']:>10}  {m['tempo_s'] * 1000:>11.1f}  "
+              f"{m['parse_ms']:>10.2f}  {','.join(f for f in m['fontes'] if f)}")
+    if m_widget['bytes']:
+        print(f"bytes: {m_html['bytes'] / m_widget['bytes']:.1f}x menos com widgets")
+
+    divergentes = [
+        g for g, a, b in zip(grupos, html, widget)
+        if not a or not b or any(a[k] != b[k] for k in ('timestamps', 'series'))
+    ]
+    if args.gravar:
+        print(f"fixtures sintéticas gravadas em {FIXTURES}")
+    elif not mock.stats['fixtures']:
+        sys.exit(f"nenhuma fixture servida de {args.fixtures} (rode com --gravar)")
+    else:
+        print(f"{mock.stats['fixtures']} respostas servidas de {args.fixtures}")
+    if divergentes or 'widget' not in m_widget['fontes']:
+        sys.exit(f"widgets e HTML divergem em {len(divergentes)} comparações: {divergentes}")
+    print("widgets == html: ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mock local da Bright Data SERP API (+ Open-Meteo) para rodar e medir o
+pipeline sem gastar saldo.
+
+POST /          → corpo {"zone", "url", "format"} como a SERP API; responde
+                  conforme a URL pedida:
+                    trends/explore?q=...          HTML do explore
+                    trends/explore?q=...&date=A B janela semanal de uma série latente
+                                                  fixa por termo (backfill)
+                    trends/api/explore?req=...    widgets com token
+                    trends/api/widgetdata/multiline | comparedgeo  JSON dos widgets
+                  Se houver resposta gravada em --fixtures (<chave>.gz, ver
+                  update_pulse_v2.chave_fixture / PULSE_GRAVAR_FIXTURES) ela é
+                  reenviada; senão uma resposta sintética determinística é gerada
+                  (mesmos termos → mesmos dados no HTML e nos widgets).
+                  As de benchmarks/fixtures foram gravadas deste mock: são
+                  sintéticas também, não respostas reais do Google.
+GET  /v1/forecast → resposta Open-Meteo com uma localização por latitude.
+GET  /_stats    → contadores de requisições por status.
+
+Falhas injetadas (sorteio determinístico com --semente):
+    --taxa-429      fração de respostas 429 (com Retry-After)
+    --taxa-timeout  fração de conexões seguradas por --segurar s e fechadas
+    --status        responde sempre esse status (ex.: 401, 402) para testar o breaker
+
+Uso:
+    python benchmarks/mock_serp.py --porta 8765 --latencia-ms 800 --taxa-429 0.05
+    BRIGHT_DATA_ENDPOINT=http://127.0.0.1:8765/ \\
+    OPEN_METEO_ENDPOINT=http://127.0.0.1:8765/v1/forecast python update_pulse_v2.py
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import calendar
+import math
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, urlunsplit, parse_qs, parse_qsl, urlencode, quote
+
+# Estados na ordem em que o Trends costuma devolver o geoMapData
+ESTADOS = [
+    "São Paulo", "Rio de Janeiro", "Minas Gerais", "Paraná", "Rio Grande do Sul",
+    "Santa Catarina", "Distrito Federal", "Goiás", "Bahia", "Espírito Santo",
+    "Pernambuco", "Ceará", "Mato Grosso do Sul", "Mato Grosso", "Pará",
+    "Amazonas", "Maranhão", "Paraíba", "Rio Grande do Norte", "Alagoas",
+    "Piauí", "Sergipe", "Tocantins", "Rondônia", "Acre", "Amapá", "Roraima"
+]
+
+# Cidades para comparedgeo com resolution CITY
+CIDADES = [
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre",
+    "Campinas", "Brasília", "Florianópolis", "Goiânia", "Ribeirão Preto",
+    "São José dos Campos", "Sorocaba", "Santos", "Juiz de Fora", "Londrina",
+    "Caxias do Sul", "Uberlândia", "Niterói", "Joinville", "Salvador"
+]
+
+def _semente(texto: str) -> int:
+    return int(hashlib.sha1(texto.encode('utf-8')).hexdigest()[:8], 16)
+
+def chave_fixture(url: str) -> str:
+    """Mesma chave de update_pulse_v2.chave_fixture (URL canônica sem token)."""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != 'token'), quote_via=quote)
+    return hashlib.sha1(urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, '')).encode('utf-8')).hexdigest()
+
+def geo_cidades_sintetico(termos):
+    rng = random.Random(_semente("cidade:" + ",".join(termos)))
+    geo = []
+    for j, cidade in enumerate(CIDADES):
+        valores = [max(0, int(100 * rng.random() ** (1 + j / 5))) for _ in termos]
+        geo.append({"coordinates": {"lat": -23.0 + j * 0.1, "lng": -46.0 - j * 0.1}, "geoName": cidade,
+                    "value": valores, "formattedValue": [str(v) for v in valores], "hasData": [v > 0 for v in valores]})
+    return geo
+
+def dados_sinteticos(termos, pontos: int = 52):
+    """timelineData e geoMapData de uma comparação. Mesmo `termos`, mesmos dados."""
+    rng = random.Random(_semente(",".join(termos)))
+    bases = [rng.uniform(10, 80) for _ in termos]
+    inclinacoes = [rng.uniform(-0.5, 0.5) for _ in termos]
+    inicio = 1700000000
+
+    timeline = []
+    for i in range(pontos):
+        valores = [max(0, min(100, int(b + s * i + rng.gauss(0, 4)))) for b, s in zip(bases, inclinacoes)]
+        timeline.append({
+            "time": str(inicio + i * 604800),
+            "formattedTime": time.strftime('%d %b %Y', time.gmtime(inicio + i * 604800)),
+            "value": valores,
+            "hasData": [v > 0 for v in valores],
+            "formattedValue": [str(v) for v in valores]
+        })
+
+    geo = []
+    for j, estado in enumerate(ESTADOS):
+        valores = [max(0, int(100 * rng.random() ** (1 + j / 6))) for _ in termos]
+        geo.append({
+            "geoCode": f"BR-{j:02d}",
+            "geoName": estado,
+            "value": valores,
+            "formattedValue": [str(v) for v in valores],
+            "hasData": [v > 0 for v in valores]
+        })
+    return timeline, geo
+
+SEMANA = 604800
+EPOCA_LATENTE = 1577577600  # domingo 2019-12-29 00:00 UTC
+
+def latente(termo: str, ts: int) -> float:
+    """Interesse "absoluto" do termo na semana: sazonal + tendência + ruído, fixo por (termo, semana)."""
+    rng = random.Random(_semente("latente:" + termo))
+    base, amplitude, fase, tendencia = rng.uniform(20, 200), rng.uniform(0.1, 0.5), rng.uniform(0, 2 * math.pi), rng.uniform(-0.08, 0.15)
+    semana = (ts - EPOCA_LATENTE) // SEMANA
+    ruido = random.Random(_semente(f"{termo}:{semana}")).gauss(0, 0.03)
+    return max(0.0, base * (1 + amplitude * math.sin(2 * math.pi * semana / 52 + fase)) * (1 + tendencia * semana / 52) * (1 + ruido))
+
+def timeline_janela(termos, periodo: str):
+    """timelineData semanal (domingos) de `periodo` "YYYY-MM-DD YYYY-MM-DD", máximo da janela = 100."""
+    inicio, fim = (calendar.timegm(time.strptime(d, "%Y-%m-%d")) for d in periodo.split())
+    ts = EPOCA_LATENTE + -(-(inicio - EPOCA_LATENTE) // SEMANA) * SEMANA
+    pontos = []
+    while ts <= fim:
+        pontos.append((ts, [latente(t, ts) for t in termos]))
+        ts += SEMANA
+    maximo = max((max(v) for _, v in pontos), default=0) or 1
+    timeline = []
+    for ts, brutos in pontos:
+        valores = [int(round(100 * v / maximo)) for v in brutos]
+        timeline.append({"time": str(ts), "formattedTime": time.strftime('%d %b %Y', time.gmtime(ts)),
+                         "value": valores, "hasData": [v > 0 for v in valores], "formattedValue": [str(v) for v in valores]})
+    return timeline
+
+def pagina_sintetica(termos, pontos: int = 52, padding_kb: int = 0, periodo: str = None) -> str:
+    """HTML no formato do explore: blocos timelineData e geoMapData em scripts."""
+    timeline, geo = dados_sinteticos(termos, pontos)
+    if periodo:
+        timeline = timeline_janela(termos, periodo)
+    widgets = (
+        "<script>window.__widgets=[];"
+        "__widgets.push(" + json.dumps({"default": {"timelineData": timeline, "averages": []}}) + ");"
+        "__widgets.push(" + json.dumps({"default": {"geoMapData": geo}}) + ");"
+        "</script>"
+    )
+    # Peso do resto da página (CSS, scripts do app) para simular o tamanho real
+    recheio = "<!-- " + ("x" * 1022 + "\n") * padding_kb + " -->"
+    return f"<!doctype html><html><head><title>Google Trends</title></head><body>{recheio}{widgets}</body></html>"
+
+def termos_do_req(req: dict):
+    """Termos de um req do api/explore ou de um request de widget."""
+    termos = []
+    for item in req.get('comparisonItem', []):
+        if 'keyword' in item:
+            termos.append(item['keyword'])
+        else:
+            termos.extend(k['value'] for k in item['complexKeywordsRestriction']['keyword'])
+    return termos
+
+def resposta_api_sintetica(caminho: str, req: dict) -> str:
+    """Respostas da API do Trends, com o prefixo anti-XSSI `)]}'`."""
+    termos = termos_do_req(req)
+    if caminho.endswith('/explore'):
+        item = [{"geo": {"country": "BR"},
+                 "complexKeywordsRestriction": {"keyword": [{"type": "BROAD", "value": t}]}} for t in termos]
+        request = {"time": "2025-10-16 2026-10-16", "resolution": "WEEK", "locale": "pt-BR",
+                   "comparisonItem": item, "requestOptions": {"property": "", "backend": "IZG", "category": 0}}
+        token = hashlib.sha1(",".join(termos).encode('utf-8')).hexdigest()[:24]
+        widgets = [
+            {"id": "TIMESERIES", "title": "Interesse ao longo do tempo", "token": f"APP6_T{token}", "request": request, "type": "fe_line_chart"},
+            {"id": "GEO_MAP", "title": "Comparação por sub-região", "token": f"APP6_G{token}",
+             "request": {**request, "resolution": "REGION", "geo": {"country": "BR"}}, "type": "fe_geo_chart_explore"},
+        ]
+        return ")]}'\n" + json.dumps({"widgets": widgets, "keywords": [], "timeRanges": [], "examples": [], "shareText": ""})
+    timeline, geo = dados_sinteticos(termos)
+    if caminho.endswith('/multiline'):
+        return ")]}',\n" + json.dumps({"default": {"timelineData": timeline, "averages": []}})
+    if req.get('resolution') == 'CITY':
+        return ")]}',\n" + json.dumps({"default": {"geoMapData": geo_cidades_sintetico(termos)}})
+    return ")]}',\n" + json.dumps({"default": {"geoMapData": geo}})
+
+def previsao_sintetica(latitudes):
+    locais = []
+    for lat in latitudes:
+        rng = random.Random(_semente(lat))
+        maximas = [round(rng.uniform(18, 32), 1) for _ in range(7)]
+        locais.append({
+            "latitude": float(lat),
+            "current_weather": {"temperature": round(maximas[0] - 4, 1), "weathercode": rng.choice([0, 1, 2, 3, 61])},
+            "daily": {
+                "time": [f"d{i}" for i in range(7)],
+                "temperature_2m_max": maximas,
+                "temperature_2m_min": [round(m - rng.uniform(6, 12), 1) for m in maximas],
+                "weathercode": [rng.choice([0, 1, 2, 3, 45, 61, 80, 95]) for _ in range(7)]
+            }
+        })
+    return locais if len(locais) > 1 else locais[0]
+
+class MockSerp:
+    """Servidor em thread; `iniciar()` devolve a URL base."""
+
+    def __init__(self, porta: int = 0, latencia_ms: float = 0, jitter_ms: float = 0,
+                 taxa_429: float = 0, retry_after: float = 1, taxa_timeout: float = 0,
+                 segurar: float = 5, padding_kb: int = 0, fixtures: str = None, semente: int = 7,
+                 status: int = None):
+        self.porta = porta
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.taxa_timeout = taxa_timeout
+        self.segurar = segurar
+        self.padding_kb = padding_kb
+        self.fixtures = fixtures
+        self.status = status
+        self._rng = random.Random(semente)
+        self._lock = threading.Lock()
+        self.stats = {"serp": 0, "meteo": 0, "200": 0, "429": 0, "timeout": 0, "bytes": 0, "fixtures": 0}
+        self._servidor = None
+
+    def _sortear(self):
+        with self._lock:
+            sorteio = self._rng.random()
+            latencia = max(0.0, self._rng.gauss(self.latencia_ms, self.jitter_ms)) / 1000
+        if sorteio < self.taxa_timeout:
+            return 'timeout', latencia
+        if sorteio < self.taxa_timeout + self.taxa_429:
+            return '429', latencia
+        return '200', latencia
+
+    def _contar(self, **incrementos):
+        with self._lock:
+            for chave, n in incrementos.items():
+                self.stats[chave] += n
+
+    def responder_url(self, url: str) -> str:
+        if self.fixtures:
+            path = os.path.join(self.fixtures, chave_fixture(url) + '.gz')
+            if os.path.exists(path):
+                self._contar(fixtures=1)
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    return f.read()
+        partes = urlsplit(url)
+        query = parse_qs(partes.query)
+        if '/trends/api/' in partes.path:
+            return resposta_api_sintetica(partes.path, json.loads(query.get('req', ['{}'])[0]))
+        return pagina_sintetica(query.get('q', [''])[0].split(','), padding_kb=self.padding_kb,
+                                periodo=query.get('date', [None])[0])
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _responder(self, status, corpo: bytes, tipo='text/html; charset=utf-8', extra=None):
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(corpo)))
+                for chave, valor in (extra or {}).items():
+                    self.send_header(chave, valor)
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def do_POST(self):
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(tamanho) or b'{}')
+                mock._contar(serp=1)
+
+                resultado, latencia = mock._sortear()
+                if resultado == 'timeout':
+                    mock._contar(timeout=1)
+                    time.sleep(mock.segurar)
+                    self.close_connection = True
+                    return
+                time.sleep(latencia)
+                if mock.status:
+                    self._responder(mock.status, f"HTTP {mock.status}".encode('utf-8'))
+                    return
+                if resultado == '429':
+                    mock._contar(**{'429': 1})
+                    self._responder(429, b'Too Many Requests', extra={'Retry-After': str(mock.retry_after)})
+                    return
+
+                corpo = mock.responder_url(payload.get('url', '')).encode('utf-8')
+                mock._contar(**{'200': 1, 'bytes': len(corpo)})
+                self._responder(200, corpo)
+
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                if partes.path == '/_stats':
+                    with mock._lock:
+                        corpo = json.dumps(mock.stats).encode('utf-8')
+                    self._responder(200, corpo, 'application/json')
+                    return
+                mock._contar(meteo=1)
+                latitudes = parse_qs(partes.query).get('latitude', ['0'])[0].split(',')
+                corpo = json.dumps(previsao_sintetica(latitudes)).encode('utf-8')
+                self._responder(200, corpo, 'application/json')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self) -> str:
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', self.porta), self._handler())
+        self._servidor.daemon_threads = True
+        self.porta = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.porta}"
+
+    def parar(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+def argumentos(parser: argparse.ArgumentParser):
+    parser.add_argument('--latencia-ms', type=float, default=50, help='latência média por requisição SERP')
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--taxa-429', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1, help='segundos no header Retry-After dos 429')
+    parser.add_argument('--taxa-timeout', type=float, default=0.0)
+    parser.add_argument('--segurar', type=float, default=5, help='segundos que a conexão fica presa antes de cair (acima do timeout do cliente = Timeout)')
+    parser.add_argument('--padding-kb', type=int, default=150, help='peso extra por página (explore real ≈ 150-400 KB)')
+    parser.add_argument('--fixtures', help='diretório com respostas gravadas (ex.: benchmarks/fixtures)')
+    parser.add_argument('--semente', type=int, default=7)
+    parser.add_argument('--status', type=int, help='status fixo para toda requisição SERP (ex.: 401)')
+
+def criar(args, porta: int = 0) -> MockSerp:
+    return MockSerp(
+        porta=porta, latencia_ms=args.latencia_ms, jitter_ms=args.jitter_ms,
+        taxa_429=args.taxa_429, retry_after=args.retry_after, taxa_timeout=args.taxa_timeout,
+        segurar=args.segurar, padding_kb=args.padding_kb, fixtures=args.fixtures, semente=args.semente,
+        status=args.status
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock local da SERP API + Open-Meteo")
+    parser.add_argument('--porta', type=int, default=8765)
+    argumentos(parser)
+    args = parser.parse_args()
+
+    mock = criar(args, args.porta)
+    url = mock.iniciar()
+    print(f"Mock SERP em {url}/  (Open-Meteo em {url}/v1/forecast)")
+    print(f"  BRIGHT_DATA_ENDPOINT={url}/ OPEN_METEO_ENDPOINT={url}/v1/forecast")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.parar()
+        print(json.dumps(mock.stats))
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
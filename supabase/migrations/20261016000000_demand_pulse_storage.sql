@@ -0,0 +1,38 @@
+-- DEMAND PULSE - armazenamento normalizado
+--
+-- demand_pulse_destinations: uma linha por destino por execução (upsert em
+--   lote pelo update_pulse_v2.py). A chave primária (destination_id,
+--   captured_at) é o índice das consultas de histórico por destino.
+-- demand_pulse_snapshots: uma linha pequena por execução, já no formato que
+--   o radar.html lê (payload.destinations + payload.top_3_ranking).
+
+create table if not exists public.demand_pulse_destinations (
+    destination_id text        not null,
+    captured_at    timestamptz not null,
+    run_id         text        not null,
+    status         text,
+    crescimento    numeric,
+    payload        jsonb       not null,
+    primary key (destination_id, captured_at)
+);
+
+create table if not exists public.demand_pulse_snapshots (
+    id          bigint generated always as identity primary key,
+    captured_at timestamptz not null,
+    run_id      text        not null unique,
+    payload     jsonb       not null
+);
+
+-- Leitura do painel: order by captured_at desc limit 1
+create index if not exists demand_pulse_snapshots_captured_at_idx
+    on public.demand_pulse_snapshots (captured_at desc);
+
+-- RLS: o radar.html publica a chave anon, então anon só lê. A escrita vem do
+-- update_pulse_v2.py com a service role, que ignora RLS.
+alter table public.demand_pulse_destinations enable row level security;
+alter table public.demand_pulse_snapshots enable row level security;
+
+create policy "anon lê destinos" on public.demand_pulse_destinations
+    for select to anon using (true);
+create policy "anon lê snapshots" on public.demand_pulse_snapshots
+    for select to anon using (true);
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Clima em lote (fetch_weather_lote / get_weather_batch) contra um Open-Meteo
+local em http.server: objeto vs lista, lotes de OPEN_METEO_LOTE, cache sem
+requisição e falha HTTP → None / "Indisponível".
+
+Uso:
+    python -m unittest tests.test_clima
+"""
+
+import os
+import sys
+import json
+import threading
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+os.environ.update({
+    "PULSE_CACHE_DIR": "",
+    "PULSE_TELEMETRIA": "",
+    "PULSE_ARQUIVO_DIR": "",
+    "PULSE_METEO_RPS": "1000",
+    "PULSE_METEO_BURST": "1000",
+})
+sys.path.insert(0, RAIZ)
+
+import update_pulse_v2 as pulse
+
+def previsao(lat: float) -> dict:
+    """Uma localização no formato do Open-Meteo (temperatura atual = latitude)."""
+    return {
+        "latitude": lat,
+        "current_weather": {"temperature": lat, "weathercode": 0},
+        "daily": {
+            "temperature_2m_max": [25.0] * 7,
+            "temperature_2m_min": [12.0] * 7,
+            "weathercode": [3] * 7,
+        },
+    }
+
+class OpenMeteoLocal(BaseHTTPRequestHandler):
+    """Responde como o Open-Meteo: uma coordenada → objeto, várias → lista."""
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        latitudes = [float(v) for v in query['latitude'][0].split(',')]
+        self.server.requisicoes.append(latitudes)
+        if self.server.status != 200:
+            self.send_error(self.server.status)
+            return
+        corpo = [previsao(lat) for lat in latitudes]
+        dados = json.dumps(corpo[0] if len(corpo) == 1 else corpo).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+def destinos_teste(n: int) -> list:
+    return [{"id": f"d{i}", "lat": -22.0 - i, "lon": -45.0} for i in range(n)]
+
+class TesteClima(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), OpenMeteoLocal)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.endpoint = f"http://127.0.0.1:{cls.servidor.server_address[1]}/v1/forecast"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        self.servidor.requisicoes = []
+        self.servidor.status = 200
+        for alvo, valor in (("OPEN_METEO_ENDPOINT", self.endpoint),
+                            ("WEATHER_CACHE", pulse.WeatherCache(None))):
+            patcher = mock.patch.object(pulse, alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_uma_coordenada_objeto(self):
+        previsoes = pulse.fetch_weather_lote([(-22.5, -45.0)])
+        self.assertEqual(len(previsoes), 1)
+        self.assertEqual(previsoes[0]['temp_atual'], -22.5)
+        self.assertEqual(len(previsoes[0]['daily']), pulse.WEATHER_DIAS)
+
+    def test_varias_coordenadas_lista_na_ordem(self):
+        previsoes = pulse.fetch_weather_lote([(-22.0, -45.0), (-23.0, -46.0), (-24.0, -47.0)])
+        self.assertEqual([p['temp_atual'] for p in previsoes], [-22.0, -23.0, -24.0])
+        self.assertEqual(self.servidor.requisicoes, [[-22.0, -23.0, -24.0]])
+
+    def test_lotes_de_open_meteo_lote(self):
+        with mock.patch.object(pulse, "OPEN_METEO_LOTE", 2):
+            clima = pulse.get_weather_batch(destinos_teste(5))
+        self.assertEqual([len(r) for r in self.servidor.requisicoes], [2, 2, 1])
+        self.assertTrue(all(clima[d['id']] for d in destinos_teste(5)))
+        self.assertEqual(clima['d4']['temp_atual'], -26.0)
+
+    def test_cache_sem_requisicao(self):
+        destinos = destinos_teste(3)
+        pulse.get_weather_batch(destinos)
+        self.assertEqual(len(self.servidor.requisicoes), 1)
+
+        clima = pulse.get_weather_batch(destinos)
+        self.assertEqual(len(self.servidor.requisicoes), 1)
+        self.assertEqual(clima['d1']['temp_atual'], -23.0)
+
+    def test_falha_http_vira_indisponivel(self):
+        self.servidor.status = 503
+        destino = {**destinos_teste(1)[0], "nome": "Teste", "estado": "MG", "regiao": "Sul de Minas",
+                   "keywords": ["Teste MG"]}
+        clima = pulse.get_weather_batch([destino])
+        self.assertIsNone(clima['d0'])
+
+        coleta = {"trends": {"trend_data": [50] * 10, "timestamps": list(range(10))},
+                  "origins": [{"location": "São Paulo", "percent": 100}]}
+        dados = pulse.coletar_destino(destino, coleta, clima['d0'])
+        self.assertEqual(dados['previsao'], "Indisponível")
+        self.assertIsNone(dados['weather'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Armazenamento (PulseStorage + SqliteBackend) num SQLite temporário: upsert
+idempotente por (destino, hora da coleta), stale sem linha de histórico,
+rodada parcial (`somente`) e leitura de ultimo_snapshot / historico_destino.
+
+Uso:
+    python -m unittest tests.test_storage
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+os.environ.update({
+    "PULSE_CACHE_DIR": "",
+    "PULSE_TELEMETRIA": "",
+    "PULSE_ARQUIVO_DIR": "",
+})
+sys.path.insert(0, RAIZ)
+
+import update_pulse_v2 as pulse
+
+def registro(destino_id: str, crescimento: float, quando: str, stale: bool = False) -> dict:
+    """Destino já com métricas, no formato de publicar()."""
+    return {
+        "id": destino_id, "nome": destino_id.title(), "status": "Em alta", "crescimento": crescimento,
+        "timeline": [40, 50, 60], "timelineTimes": [1, 2, 3], "weather": None, "insight": "",
+        "pressaoReserva": 50, "velocidadeViral": 40, "gatilhoProximidade": 30, "sentimento": 70,
+        "intencaoEstadia": 60, "perfilPublico": {"casais": 55},
+        "topOrigins": [{"origem": "São Paulo", "posicao": 1, "percentual": 100}],
+        "ultimaAtualizacao": quando, "stale": stale,
+    }
+
+class TesteStorage(unittest.TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.backend = pulse.SqliteBackend(os.path.join(diretorio.name, 'pulse.db'))
+        self.addCleanup(self.backend.conn.close)
+        self.storage = pulse.PulseStorage(self.backend)
+
+    def linhas(self) -> int:
+        return self.backend.conn.execute(f"select count(*) from {pulse.TABELA_DESTINOS}").fetchone()[0]
+
+    def test_rodar_de_novo_nao_duplica(self):
+        dados = [registro("a", 10, "2026-10-16T08:00:00"), registro("b", -5, "2026-10-16T08:01:00")]
+        self.storage.salvar_execucao("r1", dados, ["a", "b"])
+        self.storage.salvar_execucao("r1", dados, ["a", "b"])
+        self.assertEqual(self.linhas(), 2)
+
+        # Outra execução reaproveitando a coleta (--fresh-hours): mesma chave
+        self.storage.salvar_execucao("r2", dados, ["a", "b"])
+        self.assertEqual(self.linhas(), 2)
+
+    def test_coleta_nova_vira_linha_nova(self):
+        self.storage.salvar_execucao("r1", [registro("a", 10, "2026-10-15T08:00:00")], ["a"])
+        self.storage.salvar_execucao("r2", [registro("a", 12, "2026-10-16T08:00:00")], ["a"])
+        historico = self.backend.historico_destino("a")
+        self.assertEqual([h['payload']['crescimento'] for h in historico], [12, 10])
+
+    def test_stale_e_parcial_sem_linha(self):
+        dados = [registro("a", 10, "2026-10-16T08:00:00"),
+                 registro("b", 3, "2026-10-15T08:00:00", stale=True),
+                 registro("c", 7, "2026-10-16T08:02:00")]
+        self.storage.salvar_execucao("r1", dados, ["a", "c", "b"], somente={"a", "b"})
+        self.assertEqual([r[0] for r in self.backend.conn.execute(
+            f"select destination_id from {pulse.TABELA_DESTINOS}")], ["a"])
+
+    def test_ultimo_snapshot_formato_painel(self):
+        self.assertIsNone(self.backend.ultimo_snapshot())
+        self.storage.salvar_execucao("r1", [registro("a", 10, "2026-10-15T08:00:00")], ["a"],
+                                     captured_at="2026-10-15T08:05:00+00:00")
+        self.storage.salvar_execucao("r2", [registro("a", 25, "2026-10-16T08:00:00")], ["a"],
+                                     captured_at="2026-10-16T08:05:00+00:00")
+        snapshot = self.backend.ultimo_snapshot()
+        self.assertEqual(snapshot['top_3_ranking'], ["a"])
+        self.assertEqual(snapshot['destinations'][0]['recentChange'], 0.25)
+        self.assertEqual(snapshot['destinations'][0]['updatedAt'], "2026-10-16T08:00:00")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,9 +11,11 @@ VERSÃO v7.0 - API CORRETA:
 - ✅ Bright Data SERP API (especializada Google)
 - ✅ Zona: serp_api1 (NÃO web_unlocker1)
 - ✅ API Key: 29e61205-769b-4482-aecb-79f6a4bd8e35
-- ✅ Timeout 90s, retries 3x
+- ✅ Timeout adaptativo 15-90s, até 3 tentativas por requisição
+  (orçamento de retries por execução + circuit breaker)
 - ✅ Logging detalhado
-- ✅ SEM fallbacks sintéticos
+- ✅ Sem dados sintéticos: destino sem coleta repete o último valor
+  real publicado (stale); clima ausente sai "Indisponível"
 - ✅ Custo: $1.50/CPM (~$1.35/mês)
 
 DESCOBERTA CRÍTICA (14/01/2026):
@@ -22,13 +24,27 @@ Documentação oficial: "For Google, use SERP API"
 """
 
 import os
+import csv
+import sqlite3
+import glob
 import json
+import argparse
+import asyncio
 import time
-import random
 import re
-from datetime import datetime
+import gzip
+import hashlib
+import random
+import threading
+from collections import deque, OrderedDict
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
 import requests
-from supabase import create_client
+import numpy as np
 from typing import Dict, List, Optional
 
 # ============================================================================
@@ -37,49 +53,490 @@ from typing import Dict, List, Optional
 
 BRIGHT_DATA_API_KEY = "29e61205-769b-4482-aecb-79f6a4bd8e35"
 BRIGHT_DATA_ZONE = "serp_api1"  # ← MUDANÇA CRÍTICA: era "web_unlocker1"
-BRIGHT_DATA_ENDPOINT = "https://api.brightdata.com/request"
+BRIGHT_DATA_ENDPOINT = os.environ.get('BRIGHT_DATA_ENDPOINT', "https://api.brightdata.com/request")  # mock: benchmarks/mock_serp.py
 
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+SUPABASE_ENABLED = bool(SUPABASE_URL and SUPABASE_KEY)
+if not SUPABASE_ENABLED:
     print("⚠️  AVISO: Variáveis SUPABASE não configuradas")
-    SUPABASE_ENABLED = False
-else:
-    SUPABASE_ENABLED = True
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# ============================================================================
-# DESTINOS
-# ============================================================================
-
-DESTINOS = [
-    {"id": "gramado-canela", "nome": "Gramado + Canela", "keywords": ["Gramado", "Canela"], "estado": "RS", "regiao": "Serra Gaúcha"},
-    {"id": "campos-jordao", "nome": "Campos do Jordão", "keywords": ["Campos do Jordão"], "estado": "SP", "regiao": "Serra da Mantiqueira"},
-    {"id": "monte-verde", "nome": "Monte Verde", "keywords": ["Monte Verde MG"], "estado": "MG", "regiao": "Sul de Minas"},
-    {"id": "sao-lourenco", "nome": "São Lourenço", "keywords": ["São Lourenço MG"], "estado": "MG", "regiao": "Circuito das Águas"},
-    {"id": "pocos-caldas", "nome": "Poços de Caldas", "keywords": ["Poços de Caldas"], "estado": "MG", "regiao": "Sul de Minas"},
-    {"id": "sao-bento", "nome": "São Bento do Sapucaí", "keywords": ["São Bento do Sapucaí"], "estado": "SP", "regiao": "Serra da Mantiqueira"},
-    {"id": "passa-quatro", "nome": "Passa Quatro", "keywords": ["Passa Quatro MG"], "estado": "MG", "regiao": "Serra da Mantiqueira"},
-    {"id": "serra-negra", "nome": "Serra Negra", "keywords": ["Serra Negra SP"], "estado": "SP", "regiao": "Circuito das Águas"},
-    {"id": "goncalves", "nome": "Gonçalves", "keywords": ["Gonçalves MG"], "estado": "MG", "regiao": "Sul de Minas"},
-    {"id": "santo-antonio", "nome": "Santo Antônio do Pinhal", "keywords": ["Santo Antônio do Pinhal"], "estado": "SP", "regiao": "Serra da Mantiqueira"}
-]
+
+def cliente_supabase():
+    """Cliente criado só na publicação: coleta, reparse e benchmarks não importam supabase."""
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# ============================================================================
+# DESTINOS (registro em arquivo: destinos.json ou .csv)
+# ============================================================================
+
+# Padrão ao lado do script (não do cwd): importar de benchmarks/ ou tests/ funciona
+REGISTRY_PATH = os.environ.get('PULSE_DESTINOS') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'destinos.json')
+CAMPOS_DESTINO = ("id", "nome", "keywords", "estado", "regiao", "lat", "lon")
+
+def shard_de(destino_id: str, total: int) -> int:
+    """Shard estável do destino: não muda entre execuções nem máquinas."""
+    return int(hashlib.sha1(destino_id.encode('utf-8')).hexdigest()[:8], 16) % total
+
+class DestinationRegistry:
+    """
+    Registro de destinos carregado uma vez e indexado por id.
+
+    JSON: lista de objetos com CAMPOS_DESTINO.
+    CSV: mesmas colunas, keywords separadas por "|".
+    """
+
+    def __init__(self, destinos: List[Dict]):
+        self.destinos = destinos
+        self.por_id: Dict[str, Dict] = {}
+        for destino in destinos:
+            faltando = [c for c in CAMPOS_DESTINO if destino.get(c) in (None, "", [])]
+            if faltando:
+                raise ValueError(f"Destino {destino.get('id', '?')} sem campos: {', '.join(faltando)}")
+            if destino['id'] in self.por_id:
+                raise ValueError(f"Destino duplicado no registro: {destino['id']}")
+            self.por_id[destino['id']] = destino
+
+    @classmethod
+    def carregar(cls, path: str = REGISTRY_PATH) -> 'DestinationRegistry':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if path.endswith('.csv'):
+                destinos = [
+                    {**row, "keywords": [k.strip() for k in row['keywords'].split('|') if k.strip()],
+                     "lat": float(row['lat']), "lon": float(row['lon']),
+                     # Coluna opcional: célula vazia = sem tráfego (priorizar usa a busca)
+                     "trafego": float(row['trafego']) if (row.get('trafego') or '').strip() else None}
+                    for row in csv.DictReader(f)
+                ]
+            else:
+                destinos = json.load(f)
+        return cls(destinos)
+
+    def shard(self, indice: int, total: int) -> List[Dict]:
+        """Destinos do shard `indice` (0 ≤ indice < total), na ordem do registro."""
+        return [d for d in self.destinos if shard_de(d['id'], total) == indice]
+
+REGISTRY = DestinationRegistry.carregar(REGISTRY_PATH)
+DESTINOS = REGISTRY.destinos
+
+# ============================================================================
+# TELEMETRIA (spans por etapa em JSONL)
+# ============================================================================
+
+TELEMETRIA_PATH = os.environ.get('PULSE_TELEMETRIA', 'pulse-telemetria.jsonl')  # vazio = desligada
+SERP_CPM_USD = 1.50  # custo por mil requisições SERP
+
+class Telemetria:
+    """
+    Spans leves (fetch, parse, metrics, publish) com latência e atributos
+    livres (bytes, tentativas, status HTTP, espera). Ficam em memória e vão
+    para o JSONL em blocos, então o custo por span é um dict e um
+    perf_counter — pode ficar ligada em produção.
+    """
+
+    FLUSH_A_CADA = 50
+
+    def __init__(self, path: Optional[str] = TELEMETRIA_PATH):
+        self.path = path or None
+        self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self._lock = threading.Lock()
+        self._pendentes: List[Dict] = []
+        self.spans: List[Dict] = []
+        self.contadores: Dict[str, int] = {}
+
+    @contextmanager
+    def span(self, etapa: str, **attrs):
+        registro = {"run_id": self.run_id, "etapa": etapa, "inicio": time.time(), **attrs}
+        t0 = time.perf_counter()
+        try:
+            yield registro
+            registro.setdefault('ok', True)
+        except BaseException as e:
+            registro['ok'] = False
+            registro['erro'] = str(e)[:120]
+            raise
+        finally:
+            registro['latencia_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+            with self._lock:
+                self.spans.append(registro)
+                self._pendentes.append(registro)
+                cheio = len(self._pendentes) >= self.FLUSH_A_CADA
+            if cheio:
+                self.flush()
+
+    def contar(self, nome: str, n: int = 1):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + n
+
+    def reiniciar(self):
+        """Começa outra rodada (modo serviço): novo run_id, spans e contadores zerados."""
+        self.flush()
+        with self._lock:
+            self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+            self.spans = []
+            self.contadores = {}
+
+    def flush(self):
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+        if not self.path or not pendentes:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in pendentes))
+        except OSError as e:
+            print(f"⚠️  Telemetria não gravada: {str(e)[:80]}")
+
+    @staticmethod
+    def _percentil(valores: List[float], p: float) -> float:
+        ordenados = sorted(valores)
+        return ordenados[min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados) + 0.5)) - 1))]
+
+    def resumo(self) -> Dict:
+        """p50/p95 por etapa, chamadas SERP e custo estimado; também vai para o JSONL."""
+        with self._lock:
+            spans = list(self.spans)
+            contadores = dict(self.contadores)
+
+        etapas = {}
+        for span in spans:
+            etapas.setdefault(span['etapa'], []).append(span['latencia_ms'])
+
+        serp_calls = contadores.get('serp_requests', 0)
+        resumo = {
+            "run_id": self.run_id,
+            "etapa": "resumo",
+            "etapas": {
+                etapa: {
+                    "n": len(lat),
+                    "p50_ms": self._percentil(lat, 50),
+                    "p95_ms": self._percentil(lat, 95),
+                    "total_ms": round(sum(lat), 2)
+                } for etapa, lat in etapas.items()
+            },
+            "contadores": contadores,
+            "serp_calls": serp_calls,
+            "custo_estimado_usd": round(serp_calls / 1000 * SERP_CPM_USD, 4)
+        }
+        with self._lock:
+            self._pendentes.append(resumo)
+        self.flush()
+        return resumo
+
+    def imprimir_resumo(self):
+        resumo = self.resumo()
+        print("⏱️  TELEMETRIA:")
+        for etapa, e in sorted(resumo['etapas'].items()):
+            print(f"   {etapa:<10} n={e['n']:<4} p50={e['p50_ms']:>9.1f} ms  p95={e['p95_ms']:>9.1f} ms  total={e['total_ms'] / 1000:>7.1f} s")
+        print(f"   SERP: {resumo['serp_calls']} chamadas ≈ US$ {resumo['custo_estimado_usd']:.4f}")
+
+TELEMETRIA = Telemetria()
+
+# ============================================================================
+# RATE LIMIT (token bucket global por provedor)
+# ============================================================================
+
+MAX_WORKERS = int(os.environ.get('PULSE_MAX_WORKERS', '4'))
+
+class TokenBucket:
+    """
+    Token bucket thread-safe.
+    `taxa` tokens por segundo, acumulando no máximo `capacidade` (rajada).
+    acquire() bloqueia até haver um token disponível.
+    """
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+
+            time.sleep(espera)
+
+# Compartilhados por todas as threads da execução
+RATE_LIMITERS = {
+    "serp": TokenBucket(
+        taxa=float(os.environ.get('PULSE_SERP_RPS', '0.5')),
+        capacidade=float(os.environ.get('PULSE_SERP_BURST', '2'))
+    ),
+    "open-meteo": TokenBucket(
+        taxa=float(os.environ.get('PULSE_METEO_RPS', '5')),
+        capacidade=float(os.environ.get('PULSE_METEO_BURST', '5'))
+    ),
+}
+
+# ============================================================================
+# RESILIÊNCIA SERP (orçamento de retries, circuit breaker, timeout adaptativo)
+# ============================================================================
+
+SERP_RETRY_BUDGET = int(os.environ.get('PULSE_RETRY_BUDGET', '10'))        # retries na execução inteira
+SERP_BACKOFF_BASE = float(os.environ.get('PULSE_BACKOFF_BASE', '2'))        # s
+SERP_BACKOFF_MAX = float(os.environ.get('PULSE_BACKOFF_MAX', '60'))         # teto de uma espera
+SERP_BREAKER_TIMEOUTS = int(os.environ.get('PULSE_BREAKER_TIMEOUTS', '4'))  # timeouts seguidos
+SERP_TIMEOUT_MIN = float(os.environ.get('PULSE_SERP_TIMEOUT_MIN', '15'))
+SERP_TIMEOUT_MAX = float(os.environ.get('PULSE_SERP_TIMEOUT_MAX', '90'))
+FIXTURES_GRAVAR = os.environ.get('PULSE_GRAVAR_FIXTURES')  # diretório: grava cada corpo 200 (benchmarks/fixtures)
+
+class CircuitOpenError(Exception):
+    """Erro que invalida a execução inteira (chave, saldo, API fora): não adianta seguir."""
+
+class RetryBudget:
+    """Retries compartilhados por todas as requisições da execução."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.usados = 0
+        self._lock = threading.Lock()
+
+    def consumir(self) -> bool:
+        with self._lock:
+            if self.usados >= self.total:
+                return False
+            self.usados += 1
+            return True
+
+    def reiniciar(self):
+        with self._lock:
+            self.usados = 0
+
+class CircuitBreaker:
+    """
+    Abre na primeira falha de autenticação/saldo ou após `max_timeouts`
+    timeouts seguidos (qualquer thread). Aberto, toda requisição falha na
+    hora com CircuitOpenError, sem rede e sem espera.
+    """
+
+    def __init__(self, max_timeouts: int):
+        self.max_timeouts = max_timeouts
+        self.timeouts_seguidos = 0
+        self.motivo: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def verificar(self):
+        if self.motivo:
+            raise CircuitOpenError(self.motivo)
+
+    def abrir(self, motivo: str):
+        with self._lock:
+            if not self.motivo:
+                self.motivo = motivo
+                print(f"🛑 Circuit breaker SERP aberto: {motivo}")
+        raise CircuitOpenError(motivo)
+
+    def sucesso(self):
+        with self._lock:
+            self.timeouts_seguidos = 0
+
+    def fechar(self):
+        """Nova tentativa após a pausa (modo serviço); a execução única nunca fecha."""
+        with self._lock:
+            self.motivo = None
+            self.timeouts_seguidos = 0
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts_seguidos += 1
+            estourou = self.timeouts_seguidos >= self.max_timeouts
+        if estourou:
+            self.abrir(f"{self.max_timeouts} timeouts seguidos")
+
+class AdaptiveTimeout:
+    """
+    Timeout a partir da latência observada: `fator` × p95 das últimas
+    respostas, entre `minimo` e o teto (o menor entre `maximo` e o timeout
+    pedido). Até haver amostras, usa o teto.
+    """
+
+    def __init__(self, minimo: float, maximo: float, fator: float = 3.0, janela: int = 50, amostras_min: int = 5):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.fator = fator
+        self.amostras_min = amostras_min
+        self._latencias = deque(maxlen=janela)
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float):
+        with self._lock:
+            self._latencias.append(segundos)
+
+    def prevista(self, padrao: float) -> float:
+        """Latência esperada de uma requisição (mediana observada; `padrao` sem amostras)."""
+        with self._lock:
+            latencias = sorted(self._latencias)
+        return latencias[len(latencias) // 2] if latencias else padrao
+
+    def calcular(self, teto: float, tentativa: int = 0) -> float:
+        with self._lock:
+            latencias = sorted(self._latencias)
+        teto = min(teto, self.maximo)
+        if len(latencias) < self.amostras_min:
+            return teto
+        p95 = latencias[min(len(latencias) - 1, int(0.95 * len(latencias)))]
+        # Cada nova tentativa após timeout ganha 50% de folga
+        return min(teto, max(self.minimo, p95 * self.fator) * 1.5 ** tentativa)
+
+SERP_RETRIES = RetryBudget(SERP_RETRY_BUDGET)
+SERP_BREAKER = CircuitBreaker(SERP_BREAKER_TIMEOUTS)
+# Um timeout por classe de endpoint: a página explore (HTML, lenta) e a API
+# JSON dos widgets têm latências bem diferentes e não dividem o p95
+SERP_TIMEOUTS = {
+    "html": AdaptiveTimeout(SERP_TIMEOUT_MIN, SERP_TIMEOUT_MAX),
+    "widgets": AdaptiveTimeout(SERP_TIMEOUT_MIN, SERP_TIMEOUT_MAX),
+}
+
+def classe_endpoint(url: str) -> str:
+    """Chave de SERP_TIMEOUTS de uma URL: /trends/api/* é JSON dos widgets, o resto é HTML."""
+    return "widgets" if urlsplit(url).path.startswith("/trends/api/") else "html"
+
+def chave_fixture(url: str) -> str:
+    """Nome da fixture de uma URL: sem o token dos widgets, que muda a cada api/explore."""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != 'token'), quote_via=quote)
+    return hashlib.sha1(urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, '')).encode('utf-8')).hexdigest()
+
+def gravar_fixture(url: str, corpo: str, diretorio: Optional[str] = None):
+    diretorio = diretorio or FIXTURES_GRAVAR
+    os.makedirs(diretorio, exist_ok=True)
+    # mtime=0: regravar a mesma resposta não muda o arquivo
+    with open(os.path.join(diretorio, f"{chave_fixture(url)}.gz"), 'wb') as raw, \
+            gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as gz:
+        gz.write(corpo.encode('utf-8'))
+
+def retry_after_segundos(valor: Optional[str]) -> Optional[float]:
+    """Header Retry-After em segundos (aceita número ou data HTTP)."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        quando = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (quando - datetime.now(quando.tzinfo)).total_seconds())
+
+def backoff_segundos(tentativa: int, retry_after: Optional[float] = None) -> float:
+    """Full jitter (uniforme entre 0 e base·2^n, até o teto); Retry-After é o piso."""
+    espera = random.uniform(0, min(SERP_BACKOFF_MAX, SERP_BACKOFF_BASE * 2 ** tentativa))
+    return max(espera, retry_after or 0.0)
+
+# ============================================================================
+# AGENDAMENTO (prazo da execução + prioridade dos destinos)
+# ============================================================================
+
+BACKUP_PATH = 'pulse-data-backup.json'
+PRAZO_RESERVA_S = float(os.environ.get('PULSE_PRAZO_RESERVA', '60'))        # guardado para publicar
+LATENCIA_PREVISTA_S = float(os.environ.get('PULSE_LATENCIA_PREVISTA', '20'))  # até medir a real
+STALE_HORAS = float(os.environ.get('PULSE_STALE_HORAS', '30'))
+
+class PrazoExcedido(Exception):
+    """A requisição não termina antes do prazo da execução: o destino fica para a próxima."""
+
+class Deadline:
+    """
+    Prazo total da execução (--prazo). Antes de cada requisição paga,
+    `reservar` confere se a latência prevista ainda cabe no que resta,
+    descontada a reserva para publicar; senão levanta PrazoExcedido.
+    """
+
+    def __init__(self):
+        self.fim: Optional[float] = None
+
+    def definir(self, minutos: Optional[float], reserva: float = PRAZO_RESERVA_S):
+        self.fim = time.monotonic() + minutos * 60 - reserva if minutos else None
+
+    def restante(self) -> float:
+        return float('inf') if self.fim is None else self.fim - time.monotonic()
+
+    def reservar(self, previsto: float):
+        if previsto > self.restante():
+            raise PrazoExcedido(f"previsto {previsto:.0f}s, restam {max(0, self.restante()):.0f}s")
+
+PRAZO = Deadline()
+
+def carregar_anteriores(path: str = BACKUP_PATH) -> Dict[str, Dict]:
+    """Último snapshot publicado (backup), base para prioridade e para os destinos adiados."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def desatualizado(anterior: Optional[Dict], agora: Optional[datetime] = None) -> bool:
+    """Sem valor anterior, marcado stale ou com mais de STALE_HORAS."""
+    if anterior is None or anterior.get('stale'):
+        return True
+    try:
+        idade = ((agora or datetime.now()) - datetime.fromisoformat(anterior['ultimaAtualizacao'])).total_seconds() / 3600
+    except (TypeError, KeyError, ValueError):
+        return True
+    return idade > STALE_HORAS
+
+def priorizar(destinos: List[Dict], anteriores: Dict[str, Dict]) -> List[Dict]:
+    """
+    Ordem de coleta: desatualizados primeiro (sem valor anterior, marcados
+    stale ou com mais de STALE_HORAS), depois maior tráfego (campo opcional
+    `trafego` do registro; sem ele, o nível recente da busca) e por fim a
+    posição no ranking da execução anterior.
+    """
+    agora = datetime.now()
+    ranking = {d['id']: i for i, d in enumerate(
+        sorted(anteriores.values(), key=lambda d: d.get('crescimento', 0), reverse=True))}
+
+    def chave(destino: Dict) -> tuple:
+        anterior = anteriores.get(destino['id'])
+        stale = desatualizado(anterior, agora)
+
+        trafego = destino.get('trafego')
+        if trafego is None:
+            recente = (anterior or {}).get('timeline') or [0]
+            trafego = sum(recente[-4:]) / len(recente[-4:])
+        return (not stale, -float(trafego), ranking.get(destino['id'], len(ranking)))
+
+    return sorted(destinos, key=chave)
 
 # ============================================================================
 # BRIGHT DATA SERP API - REQUISIÇÃO
 # ============================================================================
 
 def serp_api_request(url: str, timeout: int = 90) -> str:
+    """Requisição SERP com span de telemetria (ver _serp_api_request)."""
+    with TELEMETRIA.span('fetch', provedor='serp', url=url, tentativas=0, espera_s=0.0) as span:
+        return _serp_api_request(url, timeout, span)
+
+def _serp_api_request(url: str, timeout: int, span: Dict) -> str:
     """
     Requisição via Bright Data SERP API.
     
     SERP API é especializada em search engines (Google, Bing, etc).
     Aceita Google Trends URLs, diferente de Web Unlocker API.
     
-    Timeout: 90s (Google Trends pode demorar)
-    Retries: 3x com backoff exponencial
+    Timeout: adaptativo pela latência observada na mesma classe de
+    endpoint (SERP_TIMEOUTS), até `timeout` (90s)
+    Retries: até 3x por URL, limitados pelo orçamento da execução
+    (SERP_RETRIES), com backoff exponencial com jitter que respeita
+    Retry-After. 401/402 ou timeouts seguidos abrem o SERP_BREAKER.
+    Nada é enviado se a latência prevista não couber no PRAZO.
     """
+    SERP_BREAKER.verificar()
+    adaptativo = SERP_TIMEOUTS[classe_endpoint(url)]
+    previsto = adaptativo.prevista(LATENCIA_PREVISTA_S)
+    PRAZO.reservar(previsto)
     
     # Headers com Bearer token
     headers = {
@@ -94,25 +551,47 @@ def serp_api_request(url: str, timeout: int = 90) -> str:
         "format": "raw"
     }
     
-    # Retries com backoff exponencial
     max_retries = 3
+    timeouts = 0
     for attempt in range(max_retries):
+        if attempt and not SERP_RETRIES.consumir():
+            raise Exception(f"Orçamento de retries da execução esgotado ({SERP_RETRIES.total})")
+        
+        limite = adaptativo.calcular(timeout, timeouts)
         try:
-            print(f"         → Request attempt {attempt + 1}/{max_retries}")
+            print(f"         → Request attempt {attempt + 1}/{max_retries} (timeout {limite:.0f}s)")
+            span['tentativas'] = attempt + 1
             
+            t0 = time.perf_counter()
+            RATE_LIMITERS["serp"].acquire()
+            span['espera_s'] += time.perf_counter() - t0
+            
+            # A espera no rate limiter pode ter comido o prazo
+            PRAZO.reservar(previsto)
+            limite = min(limite, max(1.0, PRAZO.restante()))
+            
+            TELEMETRIA.contar('serp_requests')
+            t0 = time.perf_counter()
             response = requests.post(
                 BRIGHT_DATA_ENDPOINT,
                 headers=headers,
                 json=payload,
-                timeout=timeout
+                timeout=limite
             )
             
             # Log status
             print(f"         → Status: {response.status_code}")
+            span['status'] = response.status_code
             
             # Valida resposta
             if response.status_code == 200:
+                adaptativo.observar(time.perf_counter() - t0)
+                SERP_BREAKER.sucesso()
                 print(f"         → Response size: {len(response.text)} bytes")
+                span['bytes'] = len(response.content)
+                span['espera_s'] = round(span['espera_s'], 3)
+                if FIXTURES_GRAVAR:
+                    gravar_fixture(url, response.text)
                 return response.text
             
             elif response.status_code == 400:
@@ -120,14 +599,20 @@ def serp_api_request(url: str, timeout: int = 90) -> str:
                 raise Exception(f"HTTP 400: Validation failed - {response.text[:200]}")
             
             elif response.status_code == 401:
-                raise Exception(f"401 Unauthorized - API Key inválida")
+                SERP_BREAKER.abrir("401 Unauthorized - API Key inválida")
             
             elif response.status_code == 402:
-                raise Exception(f"402 Payment Required - Saldo insuficiente (${response.text})")
+                SERP_BREAKER.abrir(f"402 Payment Required - Saldo insuficiente (${response.text[:100]})")
             
             elif response.status_code == 429:
-                wait_time = 5 * (2 ** attempt)
-                print(f"         → 429 Rate Limit - Aguardando {wait_time}s")
+                SERP_BREAKER.sucesso()
+                retry_after = retry_after_segundos(response.headers.get('Retry-After'))
+                if retry_after is not None and retry_after > SERP_BACKOFF_MAX:
+                    raise Exception(f"429 com Retry-After de {retry_after:.0f}s, acima do teto de {SERP_BACKOFF_MAX:.0f}s")
+                wait_time = backoff_segundos(attempt, retry_after)
+                PRAZO.reservar(wait_time + previsto)
+                print(f"         → 429 Rate Limit - Aguardando {wait_time:.1f}s")
+                span['espera_s'] += wait_time
                 time.sleep(wait_time)
                 continue
             
@@ -135,9 +620,14 @@ def serp_api_request(url: str, timeout: int = 90) -> str:
                 raise Exception(f"HTTP {response.status_code}: {response.text[:100]}")
         
         except requests.exceptions.Timeout:
+            timeouts += 1
+            span['timeouts'] = timeouts
+            SERP_BREAKER.timeout()
             if attempt < max_retries - 1:
-                wait_time = 5 * (2 ** attempt)
-                print(f"         → Timeout - Tentando novamente em {wait_time}s")
+                wait_time = backoff_segundos(attempt)
+                PRAZO.reservar(wait_time + previsto)
+                print(f"         → Timeout ({limite:.0f}s) - Tentando novamente em {wait_time:.1f}s")
+                span['espera_s'] += wait_time
                 time.sleep(wait_time)
                 continue
             else:
@@ -148,10 +638,410 @@ def serp_api_request(url: str, timeout: int = 90) -> str:
     
     raise Exception(f"Falhou após {max_retries} tentativas")
 
+# ============================================================================
+# CACHE DE RESPOSTAS (memória + disco endereçado por conteúdo)
+# ============================================================================
+
+CACHE_DIR = os.environ.get('PULSE_CACHE_DIR', '.pulse-cache')  # vazio = só memória
+CACHE_TTL_HORAS = float(os.environ.get('PULSE_CACHE_TTL_HORAS', '20'))
+CACHE_MAX_MB = float(os.environ.get('PULSE_CACHE_MAX_MB', '200'))
+
+def normalize_url(url: str) -> str:
+    """
+    Forma canônica da URL para chave de cache.
+    Esquema/host em minúsculas, query ordenada e sempre com o mesmo encoding
+    ("Campos%20do%20Jordão" e "Campos do Jordão" viram a mesma chave).
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), quote_via=quote)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+class ResponseCache:
+    """
+    Cache de respostas da SERP API.
+
+    - Memo em processo: dict URL normalizada → corpo (vale só para a execução)
+    - Disco (opcional): corpos gzip em objetos/<sha256>, chaves/<hash da URL>.json
+      apontando para o objeto, com data de captura (TTL)
+    - Despejo por tamanho: objetos menos usados recentemente saem primeiro
+    """
+
+    def __init__(self, diretorio: Optional[str] = None, ttl_horas: float = 20, max_mb: float = 200):
+        self.diretorio = diretorio or None
+        self.ttl_segundos = ttl_horas * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._memo: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.diretorio:
+            os.makedirs(os.path.join(self.diretorio, 'objetos'), exist_ok=True)
+            os.makedirs(os.path.join(self.diretorio, 'chaves'), exist_ok=True)
+
+    def limpar_memo(self):
+        """Esvazia o memo em processo; o disco continua valendo pelo TTL."""
+        with self._lock:
+            self._memo.clear()
+
+    def _chave_path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.diretorio, 'chaves', f"{digest}.json")
+
+    def _objeto_path(self, sha: str) -> str:
+        return os.path.join(self.diretorio, 'objetos', sha[:2], sha)
+
+    def get(self, url: str) -> Optional[str]:
+        url = normalize_url(url)
+
+        with self._lock:
+            if url in self._memo:
+                self.hits += 1
+                return self._memo[url]
+
+        body = self._get_disco(url) if self.diretorio else None
+
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._memo[url] = body
+        return body
+
+    def _get_disco(self, url: str) -> Optional[str]:
+        try:
+            with open(self._chave_path(url), 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+            if time.time() - entrada['fetched_at'] > self.ttl_segundos:
+                return None
+            objeto = self._objeto_path(entrada['sha256'])
+            with gzip.open(objeto, 'rt', encoding='utf-8') as f:
+                body = f.read()
+            os.utime(objeto)  # marca uso recente para o despejo
+            return body
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, url: str, body: str):
+        url = normalize_url(url)
+
+        with self._lock:
+            self._memo[url] = body
+
+        if not self.diretorio:
+            return
+
+        try:
+            sha = hashlib.sha256(body.encode('utf-8')).hexdigest()
+            objeto = self._objeto_path(sha)
+            if not os.path.exists(objeto):
+                os.makedirs(os.path.dirname(objeto), exist_ok=True)
+                tmp = f"{objeto}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                    f.write(body)
+                os.replace(tmp, objeto)
+
+            chave = self._chave_path(url)
+            tmp = f"{chave}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"url": url, "sha256": sha, "fetched_at": time.time()}, f)
+            os.replace(tmp, chave)
+
+            self._despejar()
+        except OSError as e:
+            print(f"         → Cache em disco indisponível: {str(e)[:80]}")
+
+    def descartar(self, url: str):
+        """
+        Tira a URL do cache (memo e chave em disco). Para respostas 200 que não
+        deram dados (captcha, página sem timelineData): sem isso a falha se
+        repetiria em toda nova tentativa dentro do TTL.
+        """
+        url = normalize_url(url)
+        with self._lock:
+            self._memo.pop(url, None)
+        if self.diretorio:
+            try:
+                os.remove(self._chave_path(url))
+            except OSError:
+                pass
+
+    def _despejar(self):
+        """Remove os objetos menos usados até caber em max_bytes."""
+        raiz = os.path.join(self.diretorio, 'objetos')
+        objetos = []
+        for dirpath, _, files in os.walk(raiz):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                objetos.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in objetos)
+        if total <= self.max_bytes:
+            return
+
+        removidos = set()
+        for _, size, path in sorted(objetos):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removidos.add(os.path.basename(path))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._podar_chaves(removidos)
+
+    def _podar_chaves(self, removidos: set):
+        """Na mesma passada do despejo: tira as chaves de objetos removidos e as vencidas pelo TTL."""
+        pasta = os.path.join(self.diretorio, 'chaves')
+        agora = time.time()
+        for nome in os.listdir(pasta):
+            if nome.endswith('.tmp'):
+                continue  # escrita em andamento em outra thread
+            path = os.path.join(pasta, nome)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+                orfa = entrada['sha256'] in removidos or agora - entrada['fetched_at'] > self.ttl_segundos
+            except OSError:
+                continue
+            except (ValueError, KeyError):
+                orfa = True
+            if orfa:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+RESPONSE_CACHE = ResponseCache(CACHE_DIR, ttl_horas=CACHE_TTL_HORAS, max_mb=CACHE_MAX_MB)
+
+def cached_serp_request(url: str, timeout: int = 90) -> str:
+    """
+    serp_api_request com cache na frente.
+    Mesma URL (normalizada) dentro do TTL não gera nova chamada paga.
+    Quem extrai os dados chama RESPONSE_CACHE.descartar(url) se o corpo não servir.
+    """
+    # Uma busca por URL de cada vez: threads concorrentes esperam a primeira.
+    # A entrada sai de _INFLIGHT quando a última thread que a usa termina
+    chave = normalize_url(url)
+    with _INFLIGHT_LOCK:
+        entrada = _INFLIGHT.setdefault(chave, [threading.Lock(), 0])
+        entrada[1] += 1
+
+    try:
+        with entrada[0]:
+            body = RESPONSE_CACHE.get(url)
+            if body is not None:
+                print(f"         → Cache hit ({len(body)} bytes)")
+                TELEMETRIA.contar('cache_hits')
+                return body
+
+            body = serp_api_request(url, timeout=timeout)
+            if body:
+                RESPONSE_CACHE.put(url, body)
+            return body
+    finally:
+        with _INFLIGHT_LOCK:
+            entrada[1] -= 1
+            if entrada[1] == 0:
+                _INFLIGHT.pop(chave, None)
+
+_INFLIGHT: Dict[str, list] = {}  # URL normalizada → [lock, threads usando]
+_INFLIGHT_LOCK = threading.Lock()
+
+# ============================================================================
+# ARQUIVO DE RESPOSTAS BRUTAS (permanente, para reparse offline)
+# ============================================================================
+
+ARQUIVO_DIR = os.environ.get('PULSE_ARQUIVO_DIR', 'arquivo')  # vazio = desligado
+ARQUIVO_DIAS = float(os.environ.get('PULSE_ARQUIVO_DIAS', '0'))  # retenção; 0 = para sempre
+
+class RawArchive:
+    """
+    Todo corpo SERP de comparação, guardado por ARQUIVO_DIAS (padrão: para
+    sempre; o cache expira):
+
+    - objetos/<sha[:2]>/<sha256>.gz: corpo gzip, endereçado pelo conteúdo
+      (o mesmo payload_sha256 dos registros)
+    - indice.jsonl: uma linha por (data, corpo) com termos, destinos e modo
+      ('html', 'widget' ou 'geo' = comparedgeo de um termo), base de --reparse
+    """
+
+    def __init__(self, diretorio: Optional[str] = ARQUIVO_DIR):
+        self.diretorio = diretorio or None
+        self._lock = threading.Lock()
+        self._vistos: Optional[set] = None
+
+    def _objeto(self, sha: str) -> str:
+        return os.path.join(self.diretorio, 'objetos', sha[:2], f"{sha}.gz")
+
+    def _indice(self) -> str:
+        return os.path.join(self.diretorio, 'indice.jsonl')
+
+    def guardar(self, corpo: str, termos: List[str], modo: str) -> Optional[str]:
+        if not self.diretorio or not corpo:
+            return None
+        dados = corpo.encode('utf-8')
+        sha = hashlib.sha256(dados).hexdigest()
+        data = datetime.now().strftime('%Y-%m-%d')
+        try:
+            path = self._objeto(sha)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + '.tmp', 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+                    gz.write(dados)
+                os.replace(path + '.tmp', path)
+
+            with self._lock:
+                if self._vistos is None:
+                    self._vistos = {(e['data'], e['sha256']) for e in self.entradas()}
+                if (data, sha) in self._vistos:
+                    return sha
+                self._vistos.add((data, sha))
+                entrada = {
+                    "data": data,
+                    "capturado_em": datetime.now().isoformat(),
+                    "termos": termos,
+                    "destinos": [d['id'] for d in REGISTRY.destinos if set(d['keywords']) & set(termos)],
+                    "modo": modo,
+                    "sha256": sha
+                }
+                with open(self._indice(), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️  Arquivo bruto não gravado: {str(e)[:80]}")
+        return sha
+
+    def entradas(self, desde: Optional[str] = None, ate: Optional[str] = None,
+                 destino: Optional[str] = None, termo: Optional[str] = None) -> List[Dict]:
+        """Linhas do índice filtradas por intervalo de datas (YYYY-MM-DD, inclusivo), destino ou termo."""
+        if not self.diretorio or not os.path.exists(self._indice()):
+            return []
+        saida = []
+        with open(self._indice(), 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    e = json.loads(linha)
+                except ValueError:
+                    continue  # linha truncada por execução interrompida
+                if desde and e['data'] < desde or ate and e['data'] > ate:
+                    continue
+                if destino and destino not in e['destinos'] or termo and termo not in e['termos']:
+                    continue
+                saida.append(e)
+        return saida
+
+    def ler(self, sha: str) -> str:
+        with gzip.open(self._objeto(sha), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def podar(self, dias: float):
+        """Tira do índice as linhas com mais de `dias` dias e apaga os objetos que ficaram sem referência."""
+        if not self.diretorio or not os.path.exists(self._indice()):
+            return
+        limite = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+        with self._lock:
+            todas = self.entradas()
+            manter = [e for e in todas if e['data'] >= limite]
+            if len(manter) == len(todas):
+                return
+            tmp = f"{self._indice()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for e in manter:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            os.replace(tmp, self._indice())
+            self._vistos = None
+
+            referenciados = {e['sha256'] for e in manter}
+            for path in glob.glob(os.path.join(self.diretorio, 'objetos', '*', '*.gz')):
+                if os.path.basename(path).removesuffix('.gz') not in referenciados:
+                    os.remove(path)
+        print(f"🗄️  Arquivo bruto: {len(todas) - len(manter)} entradas com mais de {dias:g} dias removidas")
+
+ARQUIVO = RawArchive()
+
 # ============================================================================
 # PARSE HTML - RIGOROSO
 # ============================================================================
 
+# Blocos JSON dos widgets do explore que interessam
+WIDGET_KEYS = ("timelineData", "geoMapData", "rankedList")
+
+_WIDGET_KEY_RE = re.compile(r'"(' + '|'.join(WIDGET_KEYS) + r')"\s*:\s*(?=[\[{])')
+# Strings JSON inteiras (com escapes) ou delimitadores; o resto é pulado
+_JSON_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+
+def _match_brackets(text: str, start: int) -> int:
+    """
+    Fim (exclusivo) do array/objeto JSON que começa em text[start].
+    Conta colchetes/chaves fora de strings; -1 se não fechar.
+    """
+    depth = 0
+    for m in _JSON_TOKEN_RE.finditer(text, start):
+        tok = m.group()
+        if tok[0] == '"':
+            continue
+        if tok in '[{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    return -1
+
+_JSON_DECODER = json.JSONDecoder()
+
+@lru_cache(maxsize=16)
+def scan_widget_json(html: str) -> Dict[str, List]:
+    """
+    Varredura única do HTML: acha cada bloco de WIDGET_KEYS e decodifica o
+    array/objeto inteiro (arrays aninhados como `value: [..]` incluídos) com
+    um único raw_decode, que já devolve onde o bloco termina. Se o bloco não
+    for JSON válido, o casamento de colchetes pula para depois dele.
+
+    Retorna {key: [bloco, ...]} na ordem do documento. Cacheado por corpo,
+    então extract_trends_* e extract_geographic_* dividem a mesma varredura.
+    """
+    blocos = {key: [] for key in WIDGET_KEYS}
+    pos = 0
+    while True:
+        match = _WIDGET_KEY_RE.search(html, pos)
+        if not match:
+            break
+        start = match.end()
+        try:
+            bloco, pos = _JSON_DECODER.raw_decode(html, start)
+            blocos[match.group(1)].append(bloco)
+        except json.JSONDecodeError as e:
+            print(f"         → JSON inválido em {match.group(1)}: {str(e)[:50]}")
+            pos = _match_brackets(html, start)
+            if pos < 0:
+                break
+    return blocos
+
+def resumir_timeline(values: List[float]) -> Dict:
+    """Resumo padrão de uma série: valor atual e variação primeiro → último."""
+    current = values[-1]
+    previous = values[0]
+    
+    if previous == 0:
+        variation = 0
+    else:
+        variation = ((current - previous) / previous) * 100
+    
+    return {
+        "current": current,
+        "variation": round(variation, 1),
+        "trend_data": values,
+        "source": "real",
+        "data_points": len(values)
+    }
+
 def extract_trends_data_from_html(html: str) -> Optional[Dict]:
     """
     Extração RIGOROSA de dados do Google Trends.
@@ -163,19 +1053,11 @@ def extract_trends_data_from_html(html: str) -> Optional[Dict]:
         return None
     
     try:
-        # Pattern principal: timelineData
-        pattern = r'"default":\s*{[^}]*"timelineData":\s*(\[[^\]]+\])'
-        match = re.search(pattern, html, re.DOTALL)
+        # Bloco principal: timelineData
+        blocos = scan_widget_json(html)['timelineData']
         
-        if match:
-            timeline_json = match.group(1)
-            
-            # Valida JSON
-            try:
-                timeline_data = json.loads(timeline_json)
-            except json.JSONDecodeError as e:
-                print(f"         → JSON inválido: {str(e)[:50]}")
-                return None
+        if blocos:
+            timeline_data = blocos[0]
             
             # Valida estrutura
             if not isinstance(timeline_data, list) or len(timeline_data) < 2:
@@ -194,24 +1076,9 @@ def extract_trends_data_from_html(html: str) -> Optional[Dict]:
                 print(f"         → Valores insuficientes: {len(values)}")
                 return None
             
-            # Calcula variação
-            current = values[-1]
-            previous = values[0]
-            
-            if previous == 0:
-                variation = 0
-            else:
-                variation = ((current - previous) / previous) * 100
-            
-            print(f"         → Timeline extraído: {len(values)} pontos, variação {variation:+.1f}%")
-            
-            return {
-                "current": current,
-                "variation": round(variation, 1),
-                "trend_data": values,
-                "source": "real",
-                "data_points": len(values)
-            }
+            trends_data = resumir_timeline(values)
+            print(f"         → Timeline extraído: {len(values)} pontos, variação {trends_data['variation']:+.1f}%")
+            return trends_data
         
         # Pattern alternativo: TIMESERIES
         alt_pattern = r'"TIMESERIES"[^}]*"lineAnnotationText":\s*"(\d+)"'
@@ -236,6 +1103,35 @@ def extract_trends_data_from_html(html: str) -> Optional[Dict]:
         print(f"         → Erro parse: {str(e)[:80]}")
         return None
 
+def formatar_origens(regions: List[tuple], top: int = 3) -> List[Dict]:
+    """
+    Top origens no formato do backup a partir de pares (nome, valor).
+    Percentual relativo à origem líder.
+    """
+    # Ordena por valor
+    geo_sorted = sorted(regions, key=lambda r: r[1], reverse=True)
+    max_val = geo_sorted[0][1] if geo_sorted else 0
+    
+    origins = []
+    for name, value in geo_sorted[:top]:
+        if not name:
+            continue
+        
+        percentage = round((value / max_val) * 100, 2) if max_val > 0 else 0
+        impacto = "Alto" if percentage >= 50 else ("Médio" if percentage >= 20 else "Baixo")
+        
+        origins.append({
+            "posicao": len(origins) + 1,
+            "origem": name,
+            "location": name,
+            "percentual": percentage,
+            "percent": percentage,
+            "impacto": impacto,
+            "source": "real"
+        })
+    
+    return origins
+
 def extract_geographic_origins_from_html(html: str) -> Optional[List[Dict]]:
     """
     Extração RIGOROSA de origens geográficas.
@@ -245,48 +1141,20 @@ def extract_geographic_origins_from_html(html: str) -> Optional[List[Dict]]:
         return None
     
     try:
-        pattern = r'"geoMapData":\s*(\[[^\]]+\])'
-        match = re.search(pattern, html, re.DOTALL)
+        blocos = scan_widget_json(html)['geoMapData']
         
-        if not match:
+        if not blocos:
             print(f"         → geoMapData não encontrado")
             return None
         
-        geo_json = match.group(1)
-        
-        try:
-            geo_data = json.loads(geo_json)
-        except json.JSONDecodeError:
-            print(f"         → geoMapData JSON inválido")
-            return None
+        geo_data = blocos[0]
         
         if not isinstance(geo_data, list) or len(geo_data) == 0:
             print(f"         → geoMapData vazio")
             return None
         
-        # Ordena por valor
-        geo_sorted = sorted(geo_data, key=lambda x: x.get('value', [0])[0], reverse=True)
-        
-        origins = []
-        for idx, region in enumerate(geo_sorted[:3], 1):
-            name = region.get('geoName')
-            if not name:
-                continue
-            
-            value = region.get('value', [0])[0]
-            max_val = geo_sorted[0].get('value', [1])[0]
-            percentage = round((value / max_val) * 100, 2) if max_val > 0 else 0
-            impacto = "Alto" if percentage >= 50 else ("Médio" if percentage >= 20 else "Baixo")
-            
-            origins.append({
-                "posicao": idx,
-                "origem": name,
-                "location": name,
-                "percentual": percentage,
-                "percent": percentage,
-                "impacto": impacto,
-                "source": "real"
-            })
+        regions = [(region.get('geoName'), region.get('value', [0])[0]) for region in geo_data]
+        origins = formatar_origens(regions)
         
         if origins:
             print(f"         → Origens extraídas: {[o['origem'] for o in origins]}")
@@ -302,31 +1170,41 @@ def extract_geographic_origins_from_html(html: str) -> Optional[List[Dict]]:
 # COLETA DE DADOS
 # ============================================================================
 
+def build_explore_url(keyword: str, periodo: Optional[str] = None) -> str:
+    """URL do explore do Google Trends (Brasil) para a keyword; `periodo` vai em date= (padrão: 12 meses)."""
+    url = f"https://trends.google.com/trends/explore?geo=BR&q={keyword.replace(' ', '%20')}"
+    return f"{url}&date={quote(periodo)}" if periodo else url
+
 def get_trends_data_direct(keyword: str) -> Optional[Dict]:
     """
     Coleta dados via SERP API.
     """
     try:
-        trends_url = f"https://trends.google.com/trends/explore?geo=BR&q={keyword.replace(' ', '%20')}"
+        trends_url = build_explore_url(keyword)
         print(f"      🔍 URL: {trends_url[:80]}...")
         
-        html = serp_api_request(trends_url, timeout=90)
+        html = cached_serp_request(trends_url, timeout=90)
         
         if not html:
             print(f"      ❌ HTML vazio retornado")
             return None
         
-        trends_data = extract_trends_data_from_html(html)
+        with TELEMETRIA.span('parse', bytes=len(html)):
+            trends_data = extract_trends_data_from_html(html)
         
         if trends_data:
             print(f"      ✅ Dados REAIS: {trends_data['variation']:+.1f}% ({trends_data['data_points']} pontos)")
             return trends_data
         else:
             print(f"      ❌ Parse falhou - HTML não contém dados válidos")
+            RESPONSE_CACHE.descartar(trends_url)
             return None
             
+    except (CircuitOpenError, PrazoExcedido):
+        raise
     except Exception as e:
         print(f"      ❌ Erro: {str(e)[:100]}")
+        RESPONSE_CACHE.descartar(trends_url)
         return None
 
 def get_geographic_origins_direct(keyword: str) -> Optional[List[Dict]]:
@@ -334,9 +1212,10 @@ def get_geographic_origins_direct(keyword: str) -> Optional[List[Dict]]:
     Coleta origens via SERP API.
     """
     try:
-        geo_url = f"https://trends.google.com/trends/explore?geo=BR&q={keyword.replace(' ', '%20')}"
+        geo_url = build_explore_url(keyword)
         
-        html = serp_api_request(geo_url, timeout=90)
+        # Mesma página do get_trends_data_direct: sai do cache, sem nova chamada
+        html = cached_serp_request(geo_url, timeout=90)
         
         if not html:
             return None
@@ -348,172 +1227,2435 @@ def get_geographic_origins_direct(keyword: str) -> Optional[List[Dict]]:
             return origins
         else:
             print(f"      ❌ Origens não encontradas")
+            RESPONSE_CACHE.descartar(geo_url)
             return None
             
+    except (CircuitOpenError, PrazoExcedido):
+        raise
     except Exception as e:
         print(f"      ❌ Erro origens: {str(e)[:80]}")
+        RESPONSE_CACHE.descartar(geo_url)
         return None
 
-def get_weather_data(cidade: str) -> Dict:
-    """Clima"""
-    coords = {
-        "Gramado + Canela": (-29.37, -50.87), "Campos do Jordão": (-22.74, -45.59),
-        "Monte Verde": (-22.86, -46.04), "São Lourenço": (-22.12, -45.05),
-        "Poços de Caldas": (-21.78, -46.56), "São Bento do Sapucaí": (-22.69, -45.73),
-        "Passa Quatro": (-22.39, -44.97), "Serra Negra": (-22.61, -46.70),
-        "Gonçalves": (-22.65, -45.85), "Santo Antônio do Pinhal": (-22.82, -45.66)
-    }
-    
-    lat, lon = coords.get(cidade, (-23.55, -46.63))
-    
-    try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&daily=temperature_2m_max,temperature_2m_min&timezone=America/Sao_Paulo"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        
-        current = data.get('current_weather', {})
-        daily = data.get('daily', {})
-        
-        return {
-            "temp_atual": current.get('temperature', 22),
-            "temp_max": daily.get('temperature_2m_max', [26])[0],
-            "temp_min": daily.get('temperature_2m_min', [18])[0],
-            "condicao": "Ensolarado" if current.get('weathercode', 0) < 3 else "Nublado"
-        }
-    except:
-        return {"temp_atual": 22, "temp_max": 26, "temp_min": 18, "condicao": "Parcialmente nublado"}
-
-def calcular_metricas(trends_data: Dict, origins: List[Dict], weather: Dict) -> Dict:
-    """Métricas"""
-    variation = trends_data.get('variation', 0)
-    current = trends_data.get('current', 50)
-    
-    status = "Aquecendo" if variation > 15 else ("Arrefecendo" if variation < -15 else "Estável")
-    emoji = "🔥" if status == "Aquecendo" else ("❄️" if status == "Arrefecendo" else "📊")
-    
-    origem_principal = origins[0]['origem'] if origins else "Desconhecido"
-    insight = f"{origem_principal} lidera com {variation:+.1f}%"
-    
-    return {
-        "status": status, "emoji": emoji, "humor": "Positivo", "crescimento": round(variation, 1),
-        "pressaoReserva": min(100, max(0, current + random.randint(-10, 10))),
-        "gatilhoProximidade": min(100, max(0, 100 - abs(int(variation)))),
-        "velocidadeViral": min(100, max(0, current + random.randint(-15, 15))),
-        "sentimento": random.randint(75, 95), "intencaoEstadia": random.randint(75, 90),
-        "perfilPublico": {"casais": 50, "familias": 50},
-        "impactoClimatico": "Favorável", "insight": insight
-    }
-
 # ============================================================================
-# MAIN
+# COMPARAÇÕES EM LOTE (até 5 termos por explore)
 # ============================================================================
 
-def main():
-    print("\n" + "="*70)
-    print("🚀 DEMAND PULSE v7.0 - SERP API (SOLUÇÃO DEFINITIVA)")
-    print("="*70)
-    print(f"📍 Destinos: {len(DESTINOS)}")
-    print(f"🔑 API: SERP API (especializada Google)")
-    print(f"🌐 Zone: {BRIGHT_DATA_ZONE}")
-    print(f"💰 Custo: $1.50/CPM (~$1.35/mês)")
-    print(f"⏱️  Timeout: 90s | Retries: 3x")
-    print(f"⚠️  SEM FALLBACKS: Apenas dados reais")
-    print("="*70 + "\n")
-    
-    final_data = []
-    destinos_sucesso = 0
-    destinos_falha = 0
-    
-    for idx, destino in enumerate(DESTINOS, 1):
-        print(f"\n[{idx}/{len(DESTINOS)}] {destino['nome']}")
-        print("-" * 70)
-        
+BATCH_MODE = os.environ.get('PULSE_BATCH', '1') != '0'
+# Âncora de volume médio: o Trends escala cada comparação a inteiros 0-100
+# pelo maior termo, então uma âncora grande (Gramado) zera as cidades pequenas
+BATCH_ANCHOR = os.environ.get('PULSE_BATCH_ANCHOR', 'Monte Verde MG')
+TRENDS_MAX_TERMOS = 5  # limite do Google Trends por comparação
+ANCORA_MEDIA = 50.0    # média da âncora após reescala, igual em todos os lotes
+SERIE_MAX_ZEROS = 0.5  # acima dessa fração de pontos zerados a série não tem resolução
+
+def extract_comparison_from_html(html: str, termos: List[str]) -> Optional[Dict]:
+    """
+    Separa uma comparação multi-termo em séries por termo.
+
+    timelineData traz, em cada ponto, `value` com um valor por termo na ordem
+    do `q=`; geoMapData idem por região.
+    """
+    if not html or len(html) < 1000:
+        print(f"         → HTML muito pequeno: {len(html) if html else 0} bytes")
+        return None
+
+    blocos = scan_widget_json(html)
+    return comparacao_de_blocos(
+        blocos['timelineData'][0] if blocos['timelineData'] else None,
+        blocos['geoMapData'][0] if blocos['geoMapData'] else None,
+        termos
+    )
+
+def geo_por_termo(geo_data, termos: List[str]) -> Dict[str, List[tuple]]:
+    """geoMapData de uma comparação → {termo: [(região, valor), ...]}."""
+    geo = {termo: [] for termo in termos}
+    if isinstance(geo_data, list):
+        for region in geo_data:
+            val = region.get('value') or []
+            if len(val) != len(termos):
+                continue
+            for termo, v in zip(termos, val):
+                geo[termo].append((region.get('geoName'), v))
+    return geo
+
+def comparacao_de_blocos(timeline, geo_data, termos: List[str]) -> Optional[Dict]:
+    """timelineData/geoMapData (da página ou dos widgets) → séries e geo por termo."""
+    if not isinstance(timeline, list) or len(timeline) < 2:
+        print(f"         → timelineData ausente ou insuficiente")
+        return None
+
+    series = {termo: [] for termo in termos}
+    timestamps = []
+    for point in timeline:
+        val = point.get('value') if isinstance(point, dict) else None
+        if not isinstance(val, list) or len(val) != len(termos):
+            print(f"         → Ponto com {len(val) if isinstance(val, list) else 0} valores, esperado {len(termos)}")
+            return None
+        timestamps.append(point.get('time'))
+        for termo, v in zip(termos, val):
+            series[termo].append(v)
+
+    return {"termos": termos, "timestamps": timestamps, "series": series, "geo": geo_por_termo(geo_data, termos)}
+
+def volumes_anteriores(destinos: List[Dict], anteriores: Dict[str, Dict]) -> Dict[str, float]:
+    """Volume estimado por keyword: média da timeline publicada (escala da âncora) dividida entre as keywords do destino."""
+    volumes = {}
+    for destino in destinos:
+        timeline = (anteriores.get(destino['id']) or {}).get('timeline') or []
+        if timeline:
+            for kw in destino['keywords']:
+                volumes[kw] = sum(timeline) / len(timeline) / len(destino['keywords'])
+    return volumes
+
+def planejar_lotes(destinos: List[Dict], ancora: str = BATCH_ANCHOR, tamanho: int = TRENDS_MAX_TERMOS,
+                   volumes: Optional[Dict[str, float]] = None,
+                   camadas: Optional[Dict[str, int]] = None) -> List[List[str]]:
+    """
+    Agrupa as keywords de todos os destinos em comparações de `tamanho` termos.
+    Cada grupo começa pela âncora, usada depois para reescalar os grupos
+    numa mesma base. Keywords repetidas entram uma vez só.
+
+    Com `volumes` (volumes_anteriores), keywords de volume parecido ficam no
+    mesmo grupo: as pequenas não dividem a escala 0-100 com as grandes.
+    Keywords sem volume conhecido entram como se tivessem o da âncora.
+    `camadas` (0 = desatualizado, 1 = em dia) vem antes do volume: os grupos
+    saem na ordem de priorizar, e o prazo corta os em dia, não os menores.
+    """
+    keywords = []
+    for destino in destinos:
+        for kw in destino['keywords']:
+            if kw != ancora and kw not in keywords:
+                keywords.append(kw)
+    if volumes or camadas:
+        keywords.sort(key=lambda kw: ((camadas or {}).get(kw, 0), -(volumes or {}).get(kw, ANCORA_MEDIA)))
+
+    passo = tamanho - 1
+    grupos = [[ancora] + keywords[i:i + passo] for i in range(0, len(keywords), passo)]
+    return grupos or [[ancora]]
+
+# Widgets JSON do Trends: api/explore devolve os tokens, widgetdata/* os dados.
+# Cada resposta tem ~10 KB contra centenas de KB do HTML, mas são 2 chamadas
+# SERP (cobradas) por comparação em vez de 1 — por isso é opcional.
+FETCH_MODE = os.environ.get('PULSE_FETCH_MODE', 'html')  # 'widget' = JSON, HTML como fallback
+TRENDS_API = "https://trends.google.com/trends/api"
+TRENDS_PERIODO = "today 12-m"
+ORIGENS_CIDADE = os.environ.get('PULSE_ORIGENS_CIDADE', '0') == '1'  # widgets: +1 comparedgeo CITY em geo_termo
+
+def trends_api_url(endpoint: str, req: Dict, token: Optional[str] = None) -> str:
+    params = {"hl": "pt-BR", "tz": "180", "req": json.dumps(req, ensure_ascii=False, separators=(',', ':'))}
+    if token:
+        params["token"] = token
+    return f"{TRENDS_API}/{endpoint}?{urlencode(params, quote_via=quote)}"
+
+def parse_trends_api(body: str):
+    """Respostas da API do Trends vêm com o prefixo anti-XSSI `)]}'`; o JSON começa no primeiro { ou [."""
+    inicio = min((i for i in (body.find('{'), body.find('[')) if i >= 0), default=-1)
+    if inicio < 0:
+        raise ValueError(f"Resposta sem JSON: {body[:60]!r}")
+    return _JSON_DECODER.raw_decode(body, inicio)[0]
+
+def resolver_widgets(termos: List[str]) -> Dict[str, Dict]:
+    """Uma chamada api/explore → {id do widget: widget} (TIMESERIES, GEO_MAP, ...)."""
+    req = {
+        "comparisonItem": [{"keyword": t, "geo": "BR", "time": TRENDS_PERIODO} for t in termos],
+        "category": 0,
+        "property": ""
+    }
+    # Sem cache: tokens expiram em minutos
+    explore = parse_trends_api(serp_api_request(trends_api_url("explore", req), timeout=30))
+    return {w['id']: w for w in explore.get('widgets', []) if 'id' in w and 'token' in w}
+
+def fetch_comparacao_widgets(termos: List[str]) -> Optional[Dict]:
+    """
+    Comparação via widgetdata/multiline (só séries: origens vêm de geo_termo).
+    O cache é por comparação (termos), não pela URL com token, então uma
+    execução no TTL nem resolve tokens de novo.
+    """
+    chave = trends_api_url("widgetdata", {"termos": termos, "time": TRENDS_PERIODO})
+    corpos = RESPONSE_CACHE.get(chave)
+    if corpos is None:
+        widgets = resolver_widgets(termos)
+        if 'TIMESERIES' not in widgets:
+            raise ValueError(f"api/explore sem widget TIMESERIES ({', '.join(widgets) or 'vazio'})")
+        serie = widgets['TIMESERIES']
+        partes = {"multiline": serp_api_request(
+            trends_api_url("widgetdata/multiline", serie['request'], serie['token']), timeout=30)}
+        corpos = json.dumps(partes, ensure_ascii=False)
+        novo = True
+    else:
+        novo = False
+        print(f"         → Cache hit widgets ({len(corpos)} bytes)")
+        TELEMETRIA.contar('cache_hits')
+    ARQUIVO.guardar(corpos, termos, 'widget')
+
+    try:
+        with TELEMETRIA.span('parse', termos=len(termos), bytes=len(corpos), fonte='widget') as span:
+            comp = extract_comparison_from_widgets(corpos, termos)
+            span['ok'] = comp is not None
+    except Exception:
+        if not novo:
+            RESPONSE_CACHE.descartar(chave)
+        raise
+    # Só entra no cache o que deu dados; um hit que não parseia sai dele
+    if comp:
+        comp['payload_sha256'] = hashlib.sha256(corpos.encode('utf-8')).hexdigest()
+        if novo:
+            RESPONSE_CACHE.put(chave, corpos)
+    elif not novo:
+        RESPONSE_CACHE.descartar(chave)
+    return comp
+
+def extract_comparison_from_widgets(corpos: str, termos: List[str]) -> Optional[Dict]:
+    """
+    Corpos {"multiline"} de fetch_comparacao_widgets → comparação. Corpos
+    arquivados antes de as origens saírem dos lotes trazem também
+    "comparedgeo" (lido como o geo da página).
+    """
+    partes = json.loads(corpos)
+    multiline = parse_trends_api(partes['multiline']).get('default', {})
+    geo = parse_trends_api(partes['comparedgeo']).get('default', {}) if 'comparedgeo' in partes else {}
+    return comparacao_de_blocos(multiline.get('timelineData'), geo.get('geoMapData'), termos)
+
+def fetch_comparacao(termos: List[str]) -> Optional[Dict]:
+    """Comparação de `termos`: widgets JSON (PULSE_FETCH_MODE=widget) ou a página do explore."""
+    if FETCH_MODE == 'widget':
         try:
-            keyword = random.choice(destino['keywords'])
-            print(f"   🔑 Keyword: {keyword}")
-            
-            # Trends
-            trends_data = get_trends_data_direct(keyword)
-            if not trends_data:
-                raise Exception("Sem dados de tendência")
-            
-            time.sleep(random.uniform(4, 6))
-            
-            # Origens
-            origins = get_geographic_origins_direct(keyword)
-            if not origins:
-                raise Exception("Sem dados de origens")
-            
-            # Clima
-            weather = get_weather_data(destino['nome'])
-            
-            # Métricas
-            metricas = calcular_metricas(trends_data, origins, weather)
-            
-            # Dados finais
-            destino_data = {
-                "id": destino['id'], "nome": destino['nome'],
-                "estado": destino['estado'], "regiao": destino['regiao'],
-                **metricas, "topOrigins": origins,
-                "previsao": f"{weather['temp_min']:.0f}°-{weather['temp_max']:.0f}° - {weather['condicao']}",
-                "ultimaAtualizacao": datetime.now().isoformat(),
-                "dataSource": "real-serp-api-v7.0"
-            }
-            
-            final_data.append(destino_data)
-            destinos_sucesso += 1
-            print(f"\n   ✅ SUCESSO: {metricas['crescimento']:+.1f}% | {metricas['status']}")
-            
+            print(f"      🔍 Lote (widgets): {', '.join(termos)}")
+            comp = fetch_comparacao_widgets(termos)
+            if comp:
+                return comp
+            print(f"      ↩️  Widgets sem dados, voltando ao HTML")
+        except (CircuitOpenError, PrazoExcedido):
+            raise
         except Exception as e:
-            destinos_falha += 1
-            print(f"\n   ❌ FALHA: {str(e)}")
+            print(f"      ↩️  Widgets falharam ({str(e)[:80]}), voltando ao HTML")
+    try:
+        url = build_explore_url(",".join(termos))
+        print(f"      🔍 Lote: {', '.join(termos)}")
+        html = cached_serp_request(url, timeout=90)
+        ARQUIVO.guardar(html, termos, 'html')
+        with TELEMETRIA.span('parse', termos=len(termos), bytes=len(html or ''), fonte='html') as span:
+            comp = extract_comparison_from_html(html, termos)
+            span['ok'] = comp is not None
+        if comp:
+            comp['payload_sha256'] = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        else:
+            RESPONSE_CACHE.descartar(url)
+        return comp
+    except (CircuitOpenError, PrazoExcedido):
+        raise
+    except Exception as e:
+        print(f"      ❌ Erro lote {termos}: {str(e)[:100]}")
+        RESPONSE_CACHE.descartar(url)
+        return None
+
+def _fetch_no_prazo(termos: List[str]) -> Optional[Dict]:
+    try:
+        return fetch_comparacao(termos)
+    except PrazoExcedido as e:
+        print(f"      ⏳ Lote adiado ({e}): {', '.join(termos)}")
+        return None
+
+# ORIGENS: numa comparação, geoMapData.value de cada região é a divisão das
+# buscas daquela região entre os termos comparados, não a distribuição de um
+# termo pelas regiões (e muda com os vizinhos do lote). Origens vêm sempre de
+# uma consulta de um termo só; mudam devagar, então a extração fica em cache
+# por ORIGENS_TTL_HORAS (~1 chamada por keyword por semana). Nível cidade
+# (PULSE_ORIGENS_CIDADE) só existe nos widgets: a página traz só estados.
+ORIGENS_TTL_HORAS = float(os.environ.get('PULSE_ORIGENS_TTL_HORAS', '168'))
+GEO_CACHE = ResponseCache(os.path.join(CACHE_DIR, 'geo') if CACHE_DIR else None,
+                          ttl_horas=ORIGENS_TTL_HORAS, max_mb=CACHE_MAX_MB)
+
+def extrair_geo_termo(corpo: str, termo: str, modo: str) -> Optional[Dict[str, List[tuple]]]:
+    """
+    Corpo de uma consulta de um termo (página 'html' ou JSON 'geo' dos
+    widgets) → {"estado": [(região, valor)], "cidade": [...] se coletado}.
+    """
+    if modo == 'geo':
+        partes = json.loads(corpo)
+        blocos = {nivel: parse_trends_api(partes[chave]).get('default', {}).get('geoMapData')
+                  for nivel, chave in (("estado", "comparedgeo"), ("cidade", "comparedgeo_cidade")) if chave in partes}
+    else:
+        encontrados = scan_widget_json(corpo)['geoMapData']
+        blocos = {"estado": encontrados[0] if encontrados else None}
+    geo = {}
+    for nivel, geo_data in blocos.items():
+        regioes = [(nome, v) for nome, v in geo_por_termo(geo_data, [termo])[termo] if nome]
+        if regioes:
+            geo[nivel] = regioes
+    return geo if 'estado' in geo else None
+
+def geo_termo(termo: str) -> Optional[Dict[str, List[tuple]]]:
+    """
+    Interesse por região de um termo consultado sozinho. Widgets: api/explore
+    + comparedgeo do termo (e em resolução CITY com ORIGENS_CIDADE); HTML: a
+    página do explore do termo (a mesma do modo sem lote, então sai do memo
+    se já foi buscada nesta execução).
+    """
+    chave = trends_api_url("geo", {"termo": termo, "modo": FETCH_MODE, "cidade": ORIGENS_CIDADE})
+    corpo = GEO_CACHE.get(chave)
+    if corpo is not None:
+        TELEMETRIA.contar('cache_hits')
+        return json.loads(corpo)
+
+    try:
+        if FETCH_MODE == 'widget':
+            widgets = resolver_widgets([termo])
+            if 'GEO_MAP' not in widgets:
+                raise ValueError("api/explore sem widget GEO_MAP")
+            geo_map = widgets['GEO_MAP']
+            partes = {"comparedgeo": serp_api_request(trends_api_url(
+                "widgetdata/comparedgeo", geo_map['request'], geo_map['token']), timeout=30)}
+            if ORIGENS_CIDADE:
+                # Mesmo token do GEO_MAP, só muda a resolução (estado → cidade)
+                partes['comparedgeo_cidade'] = serp_api_request(trends_api_url(
+                    "widgetdata/comparedgeo", {**geo_map['request'], "resolution": "CITY"}, geo_map['token']), timeout=30)
+            bruto = json.dumps(partes, ensure_ascii=False)
+            modo = 'geo'
+        else:
+            url = build_explore_url(termo)
+            bruto = cached_serp_request(url, timeout=90)
+            modo = 'html'
+        ARQUIVO.guardar(bruto, [termo], modo)
+        geo = extrair_geo_termo(bruto, termo, modo)
+    except (CircuitOpenError, PrazoExcedido):
+        raise
+    except Exception as e:
+        print(f"      ❌ Origens de {termo}: {str(e)[:100]}")
+        return None
+
+    if not geo:
+        print(f"      ❌ Origens de {termo}: geoMapData vazio")
+        if FETCH_MODE != 'widget':
+            RESPONSE_CACHE.descartar(url)
+        return None
+    GEO_CACHE.put(chave, json.dumps(geo, ensure_ascii=False))
+    return geo
+
+def _geo_no_prazo(termo: str) -> Optional[Dict[str, List[tuple]]]:
+    try:
+        return geo_termo(termo)
+    except PrazoExcedido as e:
+        print(f"      ⏳ Origens adiadas ({e}): {termo}")
+        return None
+
+def reescalar_lotes(comparacoes: List[Dict], ancora: str) -> List[Dict]:
+    """
+    Coloca todos os grupos numa escala fixa via série da âncora:
+    fator = ANCORA_MEDIA / média(âncora do grupo).
+    Escala fixa (e não a do primeiro grupo) mantém shards e execuções
+    diferentes comparáveis entre si. Grupos sem âncora utilizável são descartados.
+    """
+    reescalados = []
+    for comp in comparacoes:
+        serie = comp['series'][ancora]
+        media = sum(serie) / len(serie) if serie else 0
+        if media <= 0:
+            print(f"      ⚠️  Âncora zerada no lote {comp['termos']}, lote descartado")
+            continue
+        fator = ANCORA_MEDIA / media
+        comp['series'] = {t: [round(v * fator, 1) for v in vals] for t, vals in comp['series'].items()}
+        comp['fator'] = round(fator, 4)
+        reescalados.append(comp)
+    return reescalados
+
+def distribuicao_origens(por_origem: Dict[str, float]) -> Dict[str, float]:
+    """Valor somado por origem → % da demanda do destino (todas as origens, maior primeiro)."""
+    total = sum(v for nome, v in por_origem.items() if nome)
+    if total <= 0:
+        return {}
+    return {nome: round(v / total * 100, 2)
+            for nome, v in sorted(por_origem.items(), key=lambda x: x[1], reverse=True) if nome and v > 0}
+
+def combinar_destino(destino: Dict, series: Dict[str, List[float]], geo: Dict[str, Dict],
+                     timestamps: Optional[List] = None) -> Optional[Dict]:
+    """
+    Série do destino = soma das séries das suas keywords (Gramado + Canela).
+    Série quase toda zerada (SERIE_MAX_ZEROS) é descartada: é falta de
+    resolução, não demanda zero.
+
+    Origens = geo de cada keyword consultada sozinha (geo_termo), como
+    fração do total da keyword e ponderada pela participação dela na série
+    do destino, em cada nível (estado e, se coletado, cidade): top 3
+    estados em `origins`, todas as origens em `distribuicao`.
+    """
+    presentes = [kw for kw in destino['keywords'] if kw in series]
+    if not presentes:
+        return None
+
+    values = [round(sum(vals), 1) for vals in zip(*(series[kw] for kw in presentes))]
+    if len(values) < 2:
+        return None
+    zerados = sum(1 for v in values if v <= 0)
+    if zerados > SERIE_MAX_ZEROS * len(values):
+        print(f"      ⚠️  {destino['id']}: {zerados}/{len(values)} pontos zerados, série descartada")
+        return None
+    
+    trends = resumir_timeline(values)
+    trends['timestamps'] = [int(t) for t in timestamps] if timestamps and None not in timestamps else None
+
+    total = sum(values)
+    por_nivel = {nivel: {} for nivel in NIVEIS_ORIGEM}
+    for kw in presentes:
+        peso = sum(series[kw]) / total
+        for nivel, acumulado in por_nivel.items():
+            regioes = (geo.get(kw) or {}).get(nivel) or []
+            soma = sum(v for _, v in regioes)
+            if soma <= 0:
+                continue
+            for name, v in regioes:
+                acumulado[name] = acumulado.get(name, 0) + v / soma * peso
+
+    distribuicao = {"estado": distribuicao_origens(por_nivel['estado'])}
+    if por_nivel['cidade']:
+        distribuicao["cidade"] = distribuicao_origens(por_nivel['cidade'])
+
+    return {
+        "trends": trends,
+        "origins": formatar_origens(list(por_nivel['estado'].items())) or None,
+        "distribuicao": distribuicao
+    }
+
+def termos_individuais(destino: Dict, ancora: Optional[str] = None) -> List[str]:
+    """Termos da consulta individual do destino; com âncora, ela vem primeiro."""
+    if not ancora:
+        return destino['keywords'][:TRENDS_MAX_TERMOS]
+    return [ancora] + [kw for kw in destino['keywords'] if kw != ancora][:TRENDS_MAX_TERMOS - 1]
+
+def coletar_trends_destino(destino: Dict, ancora: Optional[str] = None) -> Optional[Dict]:
+    """
+    Consulta individual: uma comparação só com as keywords do destino;
+    origens de cada keyword consultada sozinha (geo_termo).
+
+    Com `ancora` (fallback do modo em lote) a comparação inclui a âncora e
+    passa por combinar_lotes: sai na escala dos lotes ou não sai (sem
+    resolução nem contra a âncora), nunca como série 0-100 autonormalizada
+    no meio das reescaladas. Sem âncora (PULSE_BATCH=0) todos os destinos
+    saem autonormalizados.
+    """
+    comp = fetch_comparacao(termos_individuais(destino, ancora))
+    if not comp:
+        return None
+    geo = {kw: geo_termo(kw) for kw in destino['keywords'][:TRENDS_MAX_TERMOS]}
+    if ancora:
+        coleta = combinar_lotes([destino], [comp], geo, ancora).get(destino['id'])
+        if not coleta:
+            print(f"      ⚠️  {destino['id']}: sem resolução nem contra a âncora, fica com o valor anterior")
+        return coleta
+    coleta = combinar_destino(destino, comp['series'], geo, comp['timestamps'])
+    if coleta:
+        coleta['payload_sha256'] = comp['payload_sha256']
+    return coleta
+
+def coletar_trends_em_lote(destinos: List[Dict], ancora: str = BATCH_ANCHOR) -> Dict[str, Dict]:
+    """
+    Busca todos os grupos em paralelo (keywords de volume parecido juntas) e
+    o geo de cada keyword sozinha; devolve {destino_id: {"trends", "origins"}}.
+    Destinos de grupos que falharam ou com série sem resolução ficam de fora
+    (coletar_destino tenta a consulta individual com a âncora).
+    """
+    anteriores = carregar_anteriores()
+    agora = datetime.now()
+    camadas = {}
+    for destino in destinos:
+        camada = 1 - desatualizado(anteriores.get(destino['id']), agora)
+        for kw in destino['keywords']:
+            camadas[kw] = min(camadas.get(kw, camada), camada)
+    grupos = planejar_lotes(destinos, ancora, volumes=volumes_anteriores(destinos, anteriores), camadas=camadas)
+    print(f"📦 Lotes: {len(grupos)} comparações para {len(destinos)} destinos (âncora: {ancora})")
+
+    keywords = list(dict.fromkeys(kw for d in destinos for kw in d['keywords']))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        comparacoes = [c for c in executor.map(_fetch_no_prazo, grupos) if c]
+        geo = dict(zip(keywords, executor.map(_geo_no_prazo, keywords)))
+    print(f"📍 Origens: {sum(1 for g in geo.values() if g)}/{len(keywords)} keywords")
+    return combinar_lotes(destinos, comparacoes, geo, ancora)
+
+def combinar_lotes(destinos: List[Dict], comparacoes: List[Dict], geo: Dict[str, Optional[Dict]],
+                   ancora: str = BATCH_ANCHOR) -> Dict[str, Dict]:
+    """
+    Reescala as comparações pela âncora e monta a coleta de cada destino coberto.
+    Ordem canônica (pelos termos): o resultado não depende da ordem em que os
+    lotes chegaram, então o reparse do arquivo reproduz a execução original.
+
+    Termos com mais de SERIE_MAX_ZEROS dos pontos em 0 ou 1 na comparação
+    (antes de reescalar) não têm resolução: seus destinos ficam de fora.
+    """
+    sem_resolucao = set()
+    for comp in comparacoes:
+        for termo, valores in comp['series'].items():
+            if termo != ancora and sum(1 for v in valores if v <= 1) > SERIE_MAX_ZEROS * len(valores):
+                sem_resolucao.add(termo)
+    if sem_resolucao:
+        print(f"      ⚠️  Sem resolução na comparação: {', '.join(sorted(sem_resolucao))}")
+
+    comparacoes = reescalar_lotes(sorted(comparacoes, key=lambda c: c['termos']), ancora)
+    if not comparacoes:
+        return {}
+
+    series, origem_sha = {}, {}
+    for comp in comparacoes:
+        for termo in comp['termos']:
+            # A âncora aparece em todos os grupos; vale a do primeiro
+            series.setdefault(termo, comp['series'][termo])
+            origem_sha.setdefault(termo, comp['payload_sha256'])
+
+    coletas = {}
+    for destino in destinos:
+        if not all(kw in series and kw not in sem_resolucao for kw in destino['keywords']):
+            continue
+        coleta = combinar_destino(destino, series, geo, comparacoes[0]['timestamps'])
+        if coleta:
+            # Hash dos corpos brutos de onde vieram as keywords do destino
+            shas = sorted({origem_sha[kw] for kw in destino['keywords']})
+            coleta['payload_sha256'] = hashlib.sha256("".join(shas).encode('utf-8')).hexdigest()
+            coletas[destino['id']] = coleta
+    return coletas
+
+# ============================================================================
+# CLIMA - OPEN-METEO (lote + sessão + cache por dia)
+# ============================================================================
+
+OPEN_METEO_ENDPOINT = os.environ.get('OPEN_METEO_ENDPOINT', 'https://api.open-meteo.com/v1/forecast')
+OPEN_METEO_LOTE = 100        # coordenadas por requisição (limite prático de URL)
+WEATHER_TTL_HORAS = 6
+WEATHER_DIAS = 7
+
+# Condições pelo código WMO do Open-Meteo
+WMO_CONDICOES = [
+    (1, "Ensolarado"), (2, "Parcialmente nublado"), (3, "Nublado"), (48, "Neblina"),
+    (67, "Chuva"), (77, "Neve"), (82, "Pancadas de chuva"), (99, "Tempestade")
+]
+
+def condicao_wmo(code: Optional[int]) -> str:
+    if code is None:
+        return "Indisponível"
+    for limite, nome in WMO_CONDICOES:
+        if code <= limite:
+            return nome
+    return "Indisponível"
+
+def _weather_session() -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+WEATHER_SESSION = _weather_session()
+
+class WeatherCache:
+    """
+    Cache de previsões por (lat, lon, dia), com TTL.
+    Persiste em <CACHE_DIR>/clima.json quando há diretório de cache.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_horas: float = WEATHER_TTL_HORAS):
+        self.path = path
+        self.ttl_segundos = ttl_horas * 3600
+        self._lock = threading.Lock()
+        self._dados: Dict[str, Dict] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._dados = json.load(f)
+            except (OSError, ValueError):
+                self._dados = {}
+
+    @staticmethod
+    def chave(lat: float, lon: float, dia: str) -> str:
+        return f"{lat:.2f},{lon:.2f},{dia}"
+
+    def get(self, lat: float, lon: float, dia: str) -> Optional[Dict]:
+        with self._lock:
+            entrada = self._dados.get(self.chave(lat, lon, dia))
+        if not entrada or time.time() - entrada['fetched_at'] > self.ttl_segundos:
+            return None
+        return entrada['weather']
+
+    def put(self, lat: float, lon: float, dia: str, weather: Dict):
+        with self._lock:
+            self._dados[self.chave(lat, lon, dia)] = {"weather": weather, "fetched_at": time.time()}
+
+    def salvar(self):
+        if not self.path:
+            return
+        with self._lock:
+            # Descarta entradas expiradas antes de gravar
+            agora = time.time()
+            self._dados = {k: v for k, v in self._dados.items() if agora - v['fetched_at'] <= self.ttl_segundos}
+            dados = dict(self._dados)
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"   ⚠️  Cache de clima não gravado: {str(e)[:80]}")
+
+WEATHER_CACHE = WeatherCache(os.path.join(CACHE_DIR, 'clima.json') if CACHE_DIR else None)
+
+def parse_open_meteo(location: Dict) -> Dict:
+    """Uma localização da resposta Open-Meteo → formato do pipeline."""
+    current = location.get('current_weather') or {}
+    daily = location.get('daily') or {}
+    maximas = daily.get('temperature_2m_max') or []
+    minimas = daily.get('temperature_2m_min') or []
+    codigos = daily.get('weathercode') or []
+
+    dias = [
+        {"max": tmax, "min": tmin, "cond": condicao_wmo(code)}
+        for tmax, tmin, code in zip(maximas, minimas, codigos)
+    ][:WEATHER_DIAS]
+
+    if not dias:
+        raise ValueError("Open-Meteo sem série diária")
+
+    return {
+        "temp_atual": current.get('temperature'),
+        "temp_max": dias[0]['max'],
+        "temp_min": dias[0]['min'],
+        "condicao": condicao_wmo(current.get('weathercode', codigos[0] if codigos else None)),
+        "daily": dias
+    }
+
+def fetch_weather_lote(coords: List[tuple]) -> List[Dict]:
+    """Uma requisição Open-Meteo para várias coordenadas (listas separadas por vírgula)."""
+    params = {
+        "latitude": ",".join(f"{lat:.2f}" for lat, _ in coords),
+        "longitude": ",".join(f"{lon:.2f}" for _, lon in coords),
+        "current_weather": "true",
+        "daily": "temperature_2m_max,temperature_2m_min,weathercode",
+        "forecast_days": WEATHER_DIAS,
+        "timezone": "America/Sao_Paulo"
+    }
+    with TELEMETRIA.span('fetch', provedor='open-meteo', coordenadas=len(coords)) as span:
+        RATE_LIMITERS["open-meteo"].acquire()
+        response = WEATHER_SESSION.get(OPEN_METEO_ENDPOINT, params=params, timeout=15)
+        span['status'] = response.status_code
+        span['bytes'] = len(response.content)
+        response.raise_for_status()
+        data = response.json()
+
+    # Uma coordenada → objeto; várias → lista na mesma ordem
+    locations = data if isinstance(data, list) else [data]
+    if len(locations) != len(coords):
+        raise ValueError(f"Open-Meteo devolveu {len(locations)} locais para {len(coords)} coordenadas")
+    return [parse_open_meteo(loc) for loc in locations]
+
+def get_weather_batch(destinos: List[Dict]) -> Dict[str, Optional[Dict]]:
+    """
+    Clima de todos os destinos: cache por (lat, lon, dia) e, para o que
+    faltar, requisições em lote de até OPEN_METEO_LOTE coordenadas.
+    Destino sem clima fica com None (sem números inventados).
+    """
+    dia = datetime.now().strftime('%Y-%m-%d')
+    resultado = {}
+    pendentes = []
+
+    for destino in destinos:
+        weather = WEATHER_CACHE.get(destino['lat'], destino['lon'], dia)
+        if weather:
+            resultado[destino['id']] = weather
+        else:
+            pendentes.append(destino)
+
+    for i in range(0, len(pendentes), OPEN_METEO_LOTE):
+        lote = pendentes[i:i + OPEN_METEO_LOTE]
+        try:
+            previsoes = fetch_weather_lote([(d['lat'], d['lon']) for d in lote])
+        except (requests.RequestException, ValueError) as e:
+            print(f"   ⚠️  Open-Meteo falhou para {len(lote)} destinos: {str(e)[:80]}")
+            continue
+        for destino, weather in zip(lote, previsoes):
+            WEATHER_CACHE.put(destino['lat'], destino['lon'], dia, weather)
+            resultado[destino['id']] = weather
+
+    WEATHER_CACHE.salvar()
+    print(f"🌦️  Clima: {len(resultado)}/{len(destinos)} destinos ({len(destinos) - len(pendentes)} do cache)")
+    return {d['id']: resultado.get(d['id']) for d in destinos}
+
+# ============================================================================
+# MÉTRICAS (lote vetorizado, determinístico)
+# ============================================================================
+
+EWMA_ALPHA = 0.3
+LIMIAR_STATUS = 15  # % de crescimento para Aquecendo/Arrefecendo
+
+def montar_matriz(series: List[List[float]]) -> np.ndarray:
+    """Séries de tamanhos diferentes → matriz (destinos × tempo), alinhada à direita com NaN."""
+    T = max((len(s) for s in series), default=0)
+    matriz = np.full((len(series), T), np.nan)
+    for i, s in enumerate(series):
+        if s:
+            matriz[i, T - len(s):] = s
+    return matriz
+
+def calcular_metricas_lote(matriz: np.ndarray, hist_media: Optional[np.ndarray] = None,
+                           hist_desvio: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Métricas de todos os destinos de uma vez sobre a matriz (destinos × tempo).
+
+    - crescimento: fim / início da reta de regressão - 1, em %
+      (robusto a um primeiro/último ponto fora da curva; nunca abaixo de -100)
+    - ewma: média móvel exponencial (EWMA_ALPHA), último valor
+    - zscore: último ponto contra o histórico do destino (ou a própria janela)
+    - momentum / aceleracao: média das 3 últimas variações e variação da
+      variação, em % do nível médio
+    Sem aleatoriedade: mesma entrada, mesma saída.
+    """
+    X = np.asarray(matriz, dtype=float)
+    D, T = X.shape
+    valido = ~np.isnan(X)
+    n = valido.sum(axis=1)
+    n_seguro = np.maximum(n, 1)
+    Xz = np.where(valido, X, 0.0)
+
+    media = Xz.sum(axis=1) / n_seguro
+    desvio = np.sqrt((np.where(valido, X - media[:, None], 0.0) ** 2).sum(axis=1) / n_seguro)
+    nivel = np.where(media > 0, media, np.nan)
+
+    # Regressão linear por linha (só pontos válidos)
+    t = np.arange(T, dtype=float)
+    t_media = (valido * t).sum(axis=1) / n_seguro
+    dt = np.where(valido, t - t_media[:, None], 0.0)
+    sxx = (dt ** 2).sum(axis=1)
+    slope = np.divide((dt * (Xz - media[:, None])).sum(axis=1), sxx, out=np.zeros(D), where=sxx > 0)
+
+    # Reta ajustada no primeiro e no último ponto válido; o fim não passa de
+    # zero (volume negativo não existe). Início ≤ 0 não dá razão: usa a
+    # inclinação sobre o nível médio.
+    t_ini = np.argmax(valido, axis=1)
+    t_fim = T - 1 - np.argmax(valido[:, ::-1], axis=1)
+    ajuste_ini = media + slope * (t_ini - t_media)
+    ajuste_fim = np.maximum(media + slope * (t_fim - t_media), 0)
+    razao = np.divide(ajuste_fim, ajuste_ini, out=np.ones(D), where=ajuste_ini > 0)
+    crescimento = np.where(ajuste_ini > 0, (razao - 1) * 100, np.nan_to_num(slope * (n - 1) / nivel * 100))
+    crescimento = np.maximum(crescimento, -100)
+
+    # EWMA coluna a coluna (vetorizado nos destinos; T é pequeno)
+    ewma = np.full(D, np.nan)
+    for j in range(T):
+        x = X[:, j]
+        ewma = np.where(np.isnan(x), ewma, np.where(np.isnan(ewma), x, EWMA_ALPHA * x + (1 - EWMA_ALPHA) * ewma))
+
+    atual = X[:, -1] if T else np.full(D, np.nan)
+
+    # Z-score contra o histórico; sem histórico, contra a própria janela
+    ref_media = media if hist_media is None else np.where(np.isnan(hist_media), media, hist_media)
+    ref_desvio = desvio if hist_desvio is None else np.where(np.isnan(hist_desvio), desvio, hist_desvio)
+    zscore = np.divide(atual - ref_media, ref_desvio, out=np.zeros(D), where=ref_desvio > 0)
+
+    if T >= 3:
+        dif = np.diff(X, axis=1)
+        ultimas = dif[:, -3:]
+        qtd = (~np.isnan(ultimas)).sum(axis=1)
+        momentum = np.divide(np.nansum(ultimas, axis=1), qtd, out=np.zeros(D), where=qtd > 0)
+        aceleracao = dif[:, -1] - dif[:, -2]
+    else:
+        momentum = aceleracao = np.zeros(D)
+    momentum = np.nan_to_num(momentum / nivel * 100)
+    aceleracao = np.nan_to_num(aceleracao / nivel * 100)
+
+    cv = np.nan_to_num(desvio / nivel)
+    pico = np.nanmax(np.where(valido, X, -np.inf), axis=1) if T else np.zeros(D)
+    relativo = np.divide(np.nan_to_num(atual), pico, out=np.zeros(D), where=pico > 0)
+    relativo_ewma = np.divide(np.nan_to_num(ewma), pico, out=np.zeros(D), where=pico > 0)
+
+    status = np.where(crescimento > LIMIAR_STATUS, 1, np.where(crescimento < -LIMIAR_STATUS, -1, 0))
+
+    def escala(v):
+        return np.clip(np.round(np.nan_to_num(v)), 0, 100).astype(int)
+
+    return {
+        "crescimento": np.round(crescimento, 1),
+        "status": status,
+        "slope": slope,
+        "ewma": np.nan_to_num(ewma),
+        "zscore": zscore,
+        "momentum": momentum,
+        "aceleracao": aceleracao,
+        # Índices 0-100 derivados dos dados (antes: randint)
+        "pressaoReserva": escala(relativo * 100),
+        "gatilhoProximidade": escala(100 - np.abs(crescimento)),
+        "velocidadeViral": escala(50 + momentum),
+        "sentimento": escala(95 - 20 * np.clip(cv, 0, 1)),
+        "intencaoEstadia": escala(75 + 15 * relativo_ewma),
+    }
+
+STATUS_LABELS = {1: ("Aquecendo", "🔥"), -1: ("Arrefecendo", "❄️"), 0: ("Estável", "📊")}
+
+def aplicar_metricas(resultados: Dict[str, Dict], referencia: Optional[tuple] = None):
+    """
+    Calcula as métricas de todos os destinos coletados e grava em cada registro.
+    `referencia`: (média, desvio) de HistoryStore.estatisticas(list(resultados)),
+    tirados ANTES de registrar a janela atual (senão o z-score se compara consigo).
+    Registros sem timeline que já têm métricas (backup antigo repetido como
+    stale) ficam como estão: recalcular de uma série vazia daria crescimento 0.
+    """
+    todos = list(resultados)
+    calcular = [k for k, i in enumerate(todos) if resultados[i].get('timeline') or 'crescimento' not in resultados[i]]
+    ids = [todos[k] for k in calcular]
+    if not ids:
+        return
+
+    matriz = montar_matriz([resultados[i].get('timeline') or [] for i in ids])
+    hist_media, hist_desvio = (referencia[0][calcular], referencia[1][calcular]) if referencia else (None, None)
+    m = calcular_metricas_lote(matriz, hist_media, hist_desvio)
+
+    for k, destino_id in enumerate(ids):
+        data = resultados[destino_id]
+        crescimento = float(m['crescimento'][k])
+        status, emoji = STATUS_LABELS[int(m['status'][k])]
+        origins = data.get('topOrigins') or []
+        origem_principal = origins[0]['origem'] if origins else "Desconhecido"
+
+        data.update({
+            "status": status, "emoji": emoji, "humor": "Positivo", "crescimento": crescimento,
+            "pressaoReserva": int(m['pressaoReserva'][k]),
+            "gatilhoProximidade": int(m['gatilhoProximidade'][k]),
+            "velocidadeViral": int(m['velocidadeViral'][k]),
+            "sentimento": int(m['sentimento'][k]), "intencaoEstadia": int(m['intencaoEstadia'][k]),
+            "perfilPublico": {"casais": 50, "familias": 50},
+            "impactoClimatico": "Favorável", "insight": f"{origem_principal} lidera com {crescimento:+.1f}%",
+            "tendencia": {
+                "ewma": round(float(m['ewma'][k]), 2), "zscore": round(float(m['zscore'][k]), 2),
+                "momentum": round(float(m['momentum'][k]), 2), "aceleracao": round(float(m['aceleracao'][k]), 2)
+            }
+        })
+
+# ============================================================================
+# COLETA POR DESTINO
+# ============================================================================
+
+def coletar_destino(destino: Dict, coleta: Optional[Dict] = None, weather: Optional[Dict] = None) -> Dict:
+    """
+    Coleta completa de um destino (trends, origens, clima).
+    As métricas saem depois, em lote, em aplicar_metricas.
+    `coleta` vem do modo em lote; sem ela, o destino é buscado sozinho.
+    `weather` vem de get_weather_batch (None = clima indisponível).
+    Levanta exceção em caso de falha; roda em thread do executor.
+    """
+    print(f"\n▶️  {destino['nome']}")
+    
+    if coleta is None:
+        print(f"   🔑 Keywords: {', '.join(destino['keywords'])}")
+        coleta = coletar_trends_destino(destino, BATCH_ANCHOR if BATCH_MODE else None)
+    
+    # Trends
+    trends_data = coleta.get('trends') if coleta else None
+    if not trends_data:
+        raise Exception("Sem dados de tendência")
+    
+    # Origens
+    origins = coleta.get('origins')
+    if not origins:
+        raise Exception("Sem dados de origens")
+    
+    # Dados finais
+    return {
+        "id": destino['id'], "nome": destino['nome'],
+        "estado": destino['estado'], "regiao": destino['regiao'],
+        "topOrigins": origins,
+        "origensDistribuicao": coleta.get('distribuicao'),
+        "timeline": trends_data['trend_data'],
+        "timelineTimes": trends_data.get('timestamps'),
+        "previsao": f"{weather['temp_min']:.0f}°-{weather['temp_max']:.0f}° - {weather['condicao']}" if weather else "Indisponível",
+        "weather": {"daily": weather['daily']} if weather else None,
+        "ultimaAtualizacao": datetime.now().isoformat(),
+        "dataSource": "real-serp-api-v7.0",
+        "payloadSha256": coleta.get('payload_sha256')
+    }
+
+# ============================================================================
+# HISTÓRICO (séries append-only em binário colunar + memmap)
+# ============================================================================
+
+HISTORY_DIR = os.environ.get('PULSE_HISTORY_DIR', 'historico')
+
+# Registros de tamanho fixo; `captura` = dias desde 1970-01-01
+HISTORY_DTYPES = {
+    "timeline": np.dtype([('destino', '<u4'), ('captura', '<i4'), ('ponto', '<i8'), ('valor', '<f4')]),
+    "origens": np.dtype([('destino', '<u4'), ('captura', '<i4'), ('origem', '<u4'), ('posicao', 'u1'), ('percentual', '<f4')]),
+    "clima": np.dtype([('destino', '<u4'), ('captura', '<i4'), ('dia', 'u1'), ('tmax', '<f4'), ('tmin', '<f4')]),
+    # Matriz esparsa origem × destino (COO), todas as origens de geo_termo; nivel 0 = estado, 1 = cidade
+    "matriz_origens": np.dtype([('destino', '<u4'), ('captura', '<i4'), ('origem', '<u4'), ('nivel', 'u1'), ('share', '<f4')]),
+}
+NIVEIS_ORIGEM = ("estado", "cidade")
+
+def dia_epoch(quando: Optional[datetime] = None) -> int:
+    return ((quando or datetime.now()).date() - datetime(1970, 1, 1).date()).days
+
+class HistoryStore:
+    """
+    Histórico local: um arquivo .bin por tabela (HISTORY_DTYPES), só append.
+
+    - Append O(1): os registros novos vão para o fim do arquivo
+    - Timeline sem repetição: cada (destino, ponto) é gravado uma vez só
+    - Leitura via np.memmap, sem carregar tudo em memória
+    - Registros em ordem de captura → recortes por data com searchsorted
+    - Dicionários ids.json (destino → código) e origens.json (nome → código)
+    """
+
+    def __init__(self, diretorio: str = HISTORY_DIR):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+        self.destinos = self._carregar_vocab('ids.json')
+        self.origens = self._carregar_vocab('origens.json')
+        self._indice_destinos = {v: i for i, v in enumerate(self.destinos)}
+        self._indice_origens = {v: i for i, v in enumerate(self.origens)}
+        self._pontos: Optional[Dict[int, set]] = None  # destino → pontos já gravados (lazy)
+
+    def _path(self, nome: str) -> str:
+        return os.path.join(self.diretorio, nome)
+
+    def _carregar_vocab(self, nome: str) -> List[str]:
+        try:
+            with open(self._path(nome), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _salvar_vocab(self, nome: str, vocab: List[str]):
+        tmp = self._path(nome) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(vocab, f, ensure_ascii=False)
+        os.replace(tmp, self._path(nome))
+
+    @staticmethod
+    def _codigo(vocab: List[str], indice: Dict[str, int], valor: str) -> int:
+        codigo = indice.get(valor)
+        if codigo is None:
+            codigo = indice[valor] = len(vocab)
+            vocab.append(valor)
+        return codigo
+
+    def _pontos_gravados(self) -> Dict[int, set]:
+        """Pontos da timeline já gravados por destino (uma leitura da tabela)."""
+        if self._pontos is None:
+            tabela = self.tabela('timeline')
+            self._pontos = {}
+            for dest, ponto in np.unique(np.stack([tabela['destino'].astype('<i8'), tabela['ponto']]), axis=1).T:
+                self._pontos.setdefault(int(dest), set()).add(int(ponto))
+        return self._pontos
+
+    def tabela(self, nome: str) -> np.ndarray:
+        """Tabela inteira como memmap somente leitura (array vazio se não houver dados)."""
+        path = self._path(f"{nome}.bin")
+        dtype = HISTORY_DTYPES[nome]
+        if not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(os.path.getsize(path) // dtype.itemsize,))
+
+    def _append(self, nome: str, registros: np.ndarray):
+        if len(registros) == 0:
+            return
+        with open(self._path(f"{nome}.bin"), 'ab') as f:
+            f.write(registros.tobytes())
+
+    def registrar(self, destino_data: Dict, quando: Optional[datetime] = None):
+        """
+        Anexa timeline, top origens, matriz de origens e clima de um destino
+        recém-coletado. Da timeline entram só os pontos que o destino ainda
+        não tem (a janela de 52 semanas se repete quase inteira a cada coleta).
+        """
+        captura = dia_epoch(quando)
+
+        with self._lock:
+            n_destinos, n_origens = len(self.destinos), len(self.origens)
+            dest = self._codigo(self.destinos, self._indice_destinos, destino_data['id'])
+
+            valores = destino_data.get('timeline') or []
+            pontos = destino_data.get('timelineTimes') or []
+            if valores and len(pontos) == len(valores):
+                gravados = self._pontos_gravados().setdefault(dest, set())
+                novos = [(p, v) for p, v in zip(pontos, valores) if int(p) not in gravados]
+                tl = np.empty(len(novos), dtype=HISTORY_DTYPES['timeline'])
+                tl['destino'], tl['captura'] = dest, captura
+                if novos:
+                    tl['ponto'], tl['valor'] = zip(*novos)
+                self._append('timeline', tl)
+                gravados.update(int(p) for p, _ in novos)
+
+            origins = destino_data.get('topOrigins') or []
+            orig = np.empty(len(origins), dtype=HISTORY_DTYPES['origens'])
+            for i, o in enumerate(origins):
+                orig[i] = (dest, captura, self._codigo(self.origens, self._indice_origens, o['origem']), o['posicao'], o['percentual'])
+            self._append('origens', orig)
+
+            distribuicao = destino_data.get('origensDistribuicao') or {}
+            celulas = [(nivel, nome, share) for nivel in NIVEIS_ORIGEM
+                       for nome, share in (distribuicao.get(nivel) or {}).items()]
+            matriz = np.empty(len(celulas), dtype=HISTORY_DTYPES['matriz_origens'])
+            for i, (nivel, nome, share) in enumerate(celulas):
+                matriz[i] = (dest, captura, self._codigo(self.origens, self._indice_origens, nome), NIVEIS_ORIGEM.index(nivel), share)
+            self._append('matriz_origens', matriz)
+
+            daily = (destino_data.get('weather') or {}).get('daily') or []
+            clima = np.empty(len(daily), dtype=HISTORY_DTYPES['clima'])
+            for i, d in enumerate(daily):
+                clima[i] = (dest, captura, i, d['max'], d['min'])
+            self._append('clima', clima)
+
+            if len(self.destinos) != n_destinos:
+                self._salvar_vocab('ids.json', self.destinos)
+            if len(self.origens) != n_origens:
+                self._salvar_vocab('origens.json', self.origens)
+
+    def intervalo(self, nome: str, destino_id: str, inicio: Optional[datetime] = None,
+                  fim: Optional[datetime] = None) -> np.ndarray:
+        """
+        Registros de `destino_id` com captura em [inicio, fim].
+        O recorte por data é binário (searchsorted); o filtro por destino
+        percorre só a fatia recortada.
+        """
+        if destino_id not in self._indice_destinos:
+            return np.empty(0, dtype=HISTORY_DTYPES[nome])
+
+        tabela = self.tabela(nome)
+        capturas = tabela['captura']
+        lo = np.searchsorted(capturas, dia_epoch(inicio), side='left') if inicio else 0
+        hi = np.searchsorted(capturas, dia_epoch(fim), side='right') if fim else len(tabela)
+        fatia = tabela[lo:hi]
+        return np.asarray(fatia[fatia['destino'] == self._indice_destinos[destino_id]])
+
+    def estatisticas(self, destino_ids: List[str]) -> tuple:
+        """
+        (média, desvio) do histórico de cada destino, numa passada só pela
+        tabela timeline (pontos recapturados contam uma vez, captura mais recente).
+        NaN para destinos sem histórico.
+        """
+        media = np.full(len(destino_ids), np.nan)
+        desvio = np.full(len(destino_ids), np.nan)
+        tabela = self.tabela('timeline')
+        if len(tabela) == 0:
+            return media, desvio
+
+        # Ordena por (destino, ponto) preservando a ordem de captura nos empates
+        ordem = np.lexsort((tabela['ponto'], tabela['destino']))
+        dest = tabela['destino'][ordem]
+        ponto = tabela['ponto'][ordem]
+        valor = tabela['valor'][ordem].astype(float)
+        ultimo = np.append((dest[1:] != dest[:-1]) | (ponto[1:] != ponto[:-1]), True)
+        dest, valor = dest[ultimo], valor[ultimo]
+
+        tamanho = len(self.destinos)
+        contagem = np.bincount(dest, minlength=tamanho)
+        soma = np.bincount(dest, weights=valor, minlength=tamanho)
+        soma_q = np.bincount(dest, weights=valor ** 2, minlength=tamanho)
+        com_dados = contagem > 0
+        m = np.divide(soma, contagem, out=np.full(tamanho, np.nan), where=com_dados)
+        v = np.divide(soma_q, contagem, out=np.full(tamanho, np.nan), where=com_dados) - m ** 2
+        d = np.sqrt(np.clip(v, 0, None))
+
+        for i, destino_id in enumerate(destino_ids):
+            codigo = self._indice_destinos.get(destino_id)
+            if codigo is not None:
+                media[i], desvio[i] = m[codigo], d[codigo]
+        return media, desvio
+
+    def matriz_origens(self, quando: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Matriz origem × destino de uma captura (padrão: a mais recente), em
+        COO: arrays alinhados origem, destino, nivel e share, com os códigos
+        de self.origens / self.destinos. Cada destino entra com sua captura
+        mais recente até `quando`.
+        """
+        tabela = self.tabela('matriz_origens')
+        hi = np.searchsorted(tabela['captura'], dia_epoch(quando), side='right') if quando else len(tabela)
+        fatia = tabela[:hi]
+        if len(fatia) == 0:
+            return {c: fatia[c] for c in ('origem', 'destino', 'nivel', 'share')}
+
+        # Última captura de cada destino
+        ultima = np.full(len(self.destinos), -1, dtype='<i4')
+        np.maximum.at(ultima, fatia['destino'], fatia['captura'])
+        fatia = fatia[fatia['captura'] == ultima[fatia['destino']]]
+        # Duas execuções no mesmo dia: vale a célula gravada por último
+        chave = (fatia['destino'].astype('<u8') << 33) | (fatia['origem'].astype('<u8') << 1) | fatia['nivel']
+        _, primeiro_reverso = np.unique(chave[::-1], return_index=True)
+        fatia = fatia[np.sort(len(fatia) - 1 - primeiro_reverso)]
+        return {c: np.asarray(fatia[c]) for c in ('origem', 'destino', 'nivel', 'share')}
+
+    def serie(self, destino_id: str) -> tuple:
+        """
+        Série longa do destino: (pontos, valores) ordenados por data do ponto.
+        Pontos capturados mais de uma vez ficam com a captura mais recente.
+        """
+        registros = self.intervalo('timeline', destino_id)
+        if len(registros) == 0:
+            return np.empty(0, dtype='<i8'), np.empty(0, dtype='<f4')
+
+        # Ordem estável por ponto; a última ocorrência de cada ponto é a mais recente
+        ordem = np.argsort(registros['ponto'], kind='stable')
+        pontos = registros['ponto'][ordem]
+        valores = registros['valor'][ordem]
+        ultimo = np.append(pontos[1:] != pontos[:-1], True)
+        return pontos[ultimo], valores[ultimo]
+
+# ============================================================================
+# CHECKPOINTS (journal por destino)
+# ============================================================================
+
+CHECKPOINT_PATH = os.environ.get('PULSE_CHECKPOINT', 'pulse-checkpoint.jsonl')
+
+class CheckpointJournal:
+    """
+    Journal append-only (JSONL) com o resultado de cada destino assim que
+    ele termina: run_id, fetched_at, hash do payload bruto e os dados.
+
+    Uma queda no meio da execução preserva tudo o que já foi coletado;
+    --resume continua a última execução e --fresh-hours reaproveita
+    destinos atualizados há pouco. Execução publicada ganha uma linha
+    {"run_id", "concluido"}: --resume nela não tem o que retomar.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.ultimos: Dict[str, Dict] = {}   # id → entrada mais recente
+        self.ultimo_run_id: Optional[str] = None
+        self.concluidas: set = set()
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entrada = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # linha truncada por queda durante a escrita
+                self.ultimo_run_id = entrada['run_id']
+                if 'concluido' in entrada:
+                    self.concluidas.add(entrada['run_id'])
+                    continue
+                self.ultimos[entrada['id']] = entrada
+
+    def compactar(self):
+        """Reescreve o journal só com a entrada mais recente de cada destino."""
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for entrada in self.ultimos.values():
+                    f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+                if self.ultimo_run_id in self.concluidas:
+                    f.write(json.dumps({"run_id": self.ultimo_run_id, "concluido": True}) + "\n")
+            os.replace(tmp, self.path)
+
+    def _anexar(self, entrada: Dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def registrar(self, run_id: str, destino_data: Dict):
+        entrada = {
+            "run_id": run_id,
+            "id": destino_data['id'],
+            "fetched_at": datetime.now().isoformat(),
+            "payload_sha256": destino_data.get('payloadSha256'),
+            "data": destino_data
+        }
+        with self._lock:
+            self._anexar(entrada)
+            self.ultimos[entrada['id']] = entrada
+            self.ultimo_run_id = run_id
+
+    def concluir(self, run_id: str):
+        """Marca a execução como publicada (última etapa de main / do shard)."""
+        with self._lock:
+            self._anexar({"run_id": run_id, "concluido": True})
+            self.concluidas.add(run_id)
+            self.ultimo_run_id = run_id
+
+    def ultima_concluida(self) -> bool:
+        """A última execução do journal foi publicada (--resume não tem o que retomar)."""
+        if self.ultimo_run_id is not None and self.ultimo_run_id in self.concluidas:
+            print(f"✅ Execução {self.ultimo_run_id} já concluída: nada a retomar")
+            return True
+        return False
+
+    def concluidos(self, run_id: str) -> Dict[str, Dict]:
+        """Destinos já gravados na execução `run_id`."""
+        return {i: e['data'] for i, e in self.ultimos.items() if e['run_id'] == run_id}
+
+    def recentes(self, horas: float) -> Dict[str, Dict]:
+        """Destinos atualizados nas últimas `horas` (qualquer execução)."""
+        limite = datetime.now() - timedelta(hours=horas)
+        return {i: e['data'] for i, e in self.ultimos.items()
+                if datetime.fromisoformat(e['fetched_at']) >= limite}
+
+# ============================================================================
+# PUBLICAÇÃO ESTÁTICA (índice + shards por destino, hash no nome, .gz)
+# ============================================================================
+
+PUBLISH_DIR = os.environ.get('PULSE_PUBLISH_DIR', 'publico')
+SNAPSHOT_VERSAO = 1
+MANIFEST_TTL = 300  # s; igual ao max-age do manifest.json em _headers
+
+# Campos do índice (ranking/cards); o resto fica no shard do destino
+CAMPOS_INDICE = ("id", "nome", "estado", "regiao", "status", "emoji", "crescimento",
+                 "pressaoReserva", "gatilhoProximidade", "velocidadeViral", "previsao", "ultimaAtualizacao", "stale")
+
+def _json_compacto(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def compactar_destino(data: Dict) -> Dict:
+    """
+    Registro do destino sem campos redundantes (location/percent duplicam
+    origem/percentual). A distribuição completa de origens sai no índice
+    de origens, não em cada destino.
+    """
+    compacto = {k: v for k, v in data.items() if v is not None and k not in ('payloadSha256', 'origensDistribuicao')}
+    compacto['topOrigins'] = [
+        {k: v for k, v in o.items() if k not in ('location', 'percent', 'source')}
+        for o in data.get('topOrigins') or []
+    ]
+    return compacto
+
+ORIGENS_TOP_K = int(os.environ.get('PULSE_ORIGENS_TOP_K', '10'))
+
+def indice_origens(final_data: List[Dict], k: int = ORIGENS_TOP_K) -> Dict:
+    """
+    Índice invertido origem → top-K destinos, montado a partir da matriz
+    esparsa origem × destino da execução (share = % da demanda do destino
+    vinda da origem, das consultas de um termo só em geo_termo; cidade só
+    com PULSE_ORIGENS_CIDADE). Ranking por score = share × (1 + crescimento/100),
+    piso 0: pesa quem manda mais gente e está aquecendo. O painel resolve
+    "o que está aquecendo entre quem mora em X" com uma consulta ao dict.
+    """
+    origens, destino, nivel, share = [], [], [], []
+    vocab: Dict[tuple, int] = {}
+    for i, data in enumerate(final_data):
+        for n, nome_nivel in enumerate(NIVEIS_ORIGEM):
+            for nome, valor in ((data.get('origensDistribuicao') or {}).get(nome_nivel) or {}).items():
+                origens.append(vocab.setdefault((nome_nivel, nome), len(vocab)))
+                destino.append(i)
+                nivel.append(n)
+                share.append(valor)
+
+    saida = {"k": k, **{n: {} for n in NIVEIS_ORIGEM}}
+    if not origens:
+        return saida
+
+    origens, destino, share = np.array(origens), np.array(destino), np.array(share, dtype=float)
+    crescimento = np.array([d.get('crescimento', 0) or 0 for d in final_data], dtype=float)
+    score = share * np.clip(1 + crescimento[destino] / 100, 0, None)
+
+    # Agrupa por origem, maior score primeiro; corta K por grupo
+    ordem = np.lexsort((-score, origens))
+    origens, destino, share, score = origens[ordem], destino[ordem], share[ordem], score[ordem]
+    inicio_grupo = np.flatnonzero(np.r_[True, origens[1:] != origens[:-1]])
+    posicao = np.arange(len(origens)) - np.repeat(inicio_grupo, np.diff(np.r_[inicio_grupo, len(origens)]))
+
+    nomes = {codigo: chave for chave, codigo in vocab.items()}
+    for j in np.flatnonzero(posicao < k):
+        nome_nivel, nome = nomes[origens[j]]
+        d = final_data[destino[j]]
+        saida[nome_nivel].setdefault(nome, []).append({
+            "id": d['id'], "share": round(float(share[j]), 2),
+            "crescimento": d.get('crescimento'), "score": round(float(score[j]), 2)
+        })
+    return saida
+
+def _gravar_versionado(diretorio: str, nome: str, conteudo: bytes) -> str:
+    """Grava <nome>.<hash>.json e o .gz ao lado; devolve o nome com hash."""
+    digest = hashlib.sha256(conteudo).hexdigest()[:12]
+    arquivo = f"{nome}.{digest}.json"
+    path = os.path.join(diretorio, arquivo)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(conteudo)
+        # mtime=0: mesmo conteúdo → mesmo .gz, byte a byte
+        with open(f"{path}.gz", 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(conteudo)
+    return arquivo
+
+def montar_indice(final_data: List[Dict], ranking: List[str]) -> Dict:
+    """Ranking + campos de resumo de cada destino (index.json e /v1/index do serviço)."""
+    return {
+        "versao": SNAPSHOT_VERSAO,
+        "ranking": ranking,
+        "destinos": [{k: d.get(k) for k in CAMPOS_INDICE} for d in final_data]
+    }
+
+def _geracao_publicada(diretorio: str) -> tuple:
+    """
+    (nomes dos arquivos do snapshot para o qual o manifest.json aponta hoje,
+    registro de aposentados {nome: quando saiu do snapshot}) do manifest atual.
+    """
+    try:
+        with open(os.path.join(diretorio, 'manifest.json'), 'rb') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return set(), {}
+    aposentados = manifest.get('aposentados') or {}
+    try:
+        with open(os.path.join(diretorio, manifest['index']), 'rb') as f:
+            shards = json.load(f).get('shards', {})
+    except (OSError, ValueError, KeyError):
+        return set(), aposentados
+    return ({os.path.basename(manifest['index']), os.path.basename(manifest.get('origens', ''))}
+            | {os.path.basename(p) for p in shards.values()}), aposentados
+
+def publicar_snapshot(final_data: List[Dict], ranking: List[str], diretorio: str = PUBLISH_DIR) -> Dict:
+    """
+    Snapshot estático para os painéis:
+
+    - publico/v1/index.<hash>.json: ranking + campos de resumo (minificado)
+    - publico/v1/destinos/<id>.<hash>.json: um por destino
+    - publico/v1/origens.<hash>.json: índice invertido origem → top-K destinos
+    - .gz pré-comprimido de cada um
+    - publico/manifest.json: aponta para o índice atual (único arquivo sem
+      hash; o resto é imutável e pode ter cache longo, ver _headers)
+
+    Um manifest.json em cache pode apontar para a geração anterior por até
+    MANIFEST_TTL: os arquivos que saem do snapshot ficam esse tempo depois de
+    aposentados e só então são removidos. A data de aposentadoria fica no
+    próprio manifest ("aposentados"), não no mtime: o checkout do CI zera os
+    mtimes a cada execução.
+    """
+    base = os.path.join(diretorio, f"v{SNAPSHOT_VERSAO}")
+    os.makedirs(os.path.join(base, 'destinos'), exist_ok=True)
+
+    shards = {}
+    for data in final_data:
+        arquivo = _gravar_versionado(os.path.join(base, 'destinos'), data['id'], _json_compacto(compactar_destino(data)))
+        shards[data['id']] = f"destinos/{arquivo}"
+
+    indice = {**montar_indice(final_data, ranking), "shards": shards}
+    arquivo_indice = _gravar_versionado(base, 'index', _json_compacto(indice))
+    arquivo_origens = _gravar_versionado(base, 'origens', _json_compacto(indice_origens(final_data)))
+    anteriores, registro = _geracao_publicada(diretorio)
+
+    # Aposentadoria: o que estava no snapshot anterior (ou sobrou sem registro,
+    # ex. queda antes do manifest) sai do snapshot agora; o que já está
+    # aposentado há mais de MANIFEST_TTL é removido
+    atuais = {arquivo_indice, arquivo_origens} | {os.path.basename(p) for p in shards.values()}
+    agora = datetime.now()
+    aposentados, expirados = {}, []
+    for pasta in (base, os.path.join(base, 'destinos')):
+        for nome in os.listdir(pasta):
+            path = os.path.join(pasta, nome)
+            chave = nome.removesuffix('.gz')
+            if not os.path.isfile(path) or chave in atuais:
+                continue
+            desde = registro.get(chave) if chave not in anteriores else None
+            if desde and (agora - datetime.fromisoformat(desde)).total_seconds() > MANIFEST_TTL:
+                expirados.append(path)
+            else:
+                aposentados[chave] = desde or agora.isoformat()
+
+    manifest = {
+        "versao": SNAPSHOT_VERSAO,
+        "gerado_em": agora.isoformat(),
+        "index": f"v{SNAPSHOT_VERSAO}/{arquivo_indice}",
+        "origens": f"v{SNAPSHOT_VERSAO}/{arquivo_origens}",
+        "aposentados": dict(sorted(aposentados.items()))
+    }
+    tmp = os.path.join(diretorio, 'manifest.json.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_json_compacto(manifest))
+    os.replace(tmp, os.path.join(diretorio, 'manifest.json'))
+
+    # Só depois que o manifest novo está no lugar
+    for path in expirados:
+        os.remove(path)
+
+    print(f"🗂️  Snapshot: {manifest['index']} + {len(shards)} shards")
+    return {"index": os.path.join(base, arquivo_indice), "origens": os.path.join(base, arquivo_origens),
+            "shards": [os.path.join(base, p) for p in shards.values()]}
+
+# ============================================================================
+# ARMAZENAMENTO (Supabase normalizado / SQLite local)
+# ============================================================================
+
+STORAGE_URL = os.environ.get('PULSE_STORAGE', '')  # "sqlite:pulse.db" = stand-in local
+TABELA_DESTINOS = 'demand_pulse_destinations'
+TABELA_SNAPSHOTS = 'demand_pulse_snapshots'
+STORAGE_RETRIES = 3
+
+def formatar_para_dashboard(data: Dict) -> Dict:
+    """Destino no formato que o radar.html lê (pulse-data.json)."""
+    return {
+        "id": data['id'],
+        "name": data['nome'],
+        "recentChange": round(data['crescimento'] / 100, 4),
+        "timeline": data.get('timeline') or [],
+        "weather": data.get('weather') or {"daily": []},
+        "insight": data.get('insight'),
+        "bookingPressure": data['pressaoReserva'] / 100,
+        "socialBuzz": data['velocidadeViral'] / 100,
+        "proximityTrigger": data['gatilhoProximidade'] / 100,
+        "sentiment": data['sentimento'] / 100,
+        "stayIntent": data['intencaoEstadia'] / 100,
+        "audienceProfile": data['perfilPublico']['casais'] / 100,
+        "topOrigins": [{"location": o['origem'], "percent": o['percentual']} for o in data.get('topOrigins') or []],
+        "stale": bool(data.get('stale')),
+        "updatedAt": data.get('ultimaAtualizacao')
+    }
+
+class SupabaseBackend:
+    """Backend PostgREST via cliente supabase-py."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, tabela: str, linhas: List[Dict], conflito: str):
+        self.client.table(tabela).upsert(linhas, on_conflict=conflito).execute()
+
+    def insert(self, tabela: str, linha: Dict):
+        self.client.table(tabela).insert(linha).execute()
+
+class SqliteBackend:
+    """
+    Stand-in local com o mesmo esquema da migration (jsonb → TEXT).
+    Permite testar e rodar o armazenamento offline.
+    """
+
+    SCHEMA = f"""
+        create table if not exists {TABELA_DESTINOS} (
+            destination_id text not null, captured_at text not null, run_id text not null,
+            status text, crescimento real, payload text not null,
+            primary key (destination_id, captured_at)
+        );
+        create table if not exists {TABELA_SNAPSHOTS} (
+            id integer primary key autoincrement, captured_at text not null,
+            run_id text not null unique, payload text not null
+        );
+        create index if not exists demand_pulse_snapshots_captured_at_idx
+            on {TABELA_SNAPSHOTS} (captured_at desc);
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _valor(v):
+        return json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+
+    def upsert(self, tabela: str, linhas: List[Dict], conflito: str):
+        if not linhas:
+            return
+        colunas = list(linhas[0])
+        chaves = [c.strip() for c in conflito.split(',')]
+        atualizar = ", ".join(f"{c} = excluded.{c}" for c in colunas if c not in chaves)
+        sql = (f"insert into {tabela} ({', '.join(colunas)}) values ({', '.join('?' * len(colunas))}) "
+               f"on conflict ({', '.join(chaves)}) do update set {atualizar}")
+        with self.conn:
+            self.conn.executemany(sql, [[self._valor(l[c]) for c in colunas] for l in linhas])
+
+    def insert(self, tabela: str, linha: Dict):
+        colunas = list(linha)
+        with self.conn:
+            self.conn.execute(f"insert into {tabela} ({', '.join(colunas)}) values ({', '.join('?' * len(colunas))})",
+                              [self._valor(linha[c]) for c in colunas])
+
+    def ultimo_snapshot(self) -> Optional[Dict]:
+        row = self.conn.execute(f"select payload from {TABELA_SNAPSHOTS} order by captured_at desc limit 1").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def historico_destino(self, destino_id: str, limite: int = 90) -> List[Dict]:
+        rows = self.conn.execute(
+            f"select captured_at, payload from {TABELA_DESTINOS} where destination_id = ? "
+            f"order by captured_at desc limit ?", (destino_id, limite)).fetchall()
+        return [{"captured_at": c, "payload": json.loads(p)} for c, p in rows]
+
+class PulseStorage:
+    """
+    Grava uma execução:
+    - linhas normalizadas por destino, num único upsert em lote
+    - uma linha "latest" pequena no formato do painel
+    Cada operação tem retry com backoff.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _com_retry(self, descricao: str, fn, *args):
+        for attempt in range(STORAGE_RETRIES):
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt == STORAGE_RETRIES - 1:
+                    raise
+                wait_time = 2 ** attempt
+                print(f"   ⚠️  {descricao}: {str(e)[:60]} - nova tentativa em {wait_time}s")
+                time.sleep(wait_time)
+
+    def salvar_execucao(self, run_id: str, final_data: List[Dict], ranking: List[str],
+                        captured_at: Optional[str] = None, somente: Optional[set] = None):
+        """
+        `somente`: grava linhas de histórico só desses ids (rodada parcial do serviço).
+        A linha de cada destino usa a hora da coleta dele (ultimaAtualizacao),
+        não a da execução: rodar de novo, --resume ou --fresh-hours regravam a
+        mesma chave em vez de duplicar a captura.
+        """
+        captured_at = captured_at or datetime.now().astimezone().isoformat()
+
+        def coletado_em(d: Dict) -> str:
+            if not d.get('ultimaAtualizacao'):
+                return captured_at
+            return datetime.fromisoformat(d['ultimaAtualizacao']).astimezone().isoformat()
+
+        linhas = [{
+            "destination_id": d['id'],
+            "captured_at": coletado_em(d),
+            "run_id": run_id,
+            "status": d['status'],
+            "crescimento": d['crescimento'],
+            "payload": compactar_destino(d)
+        } for d in final_data
+            if not d.get('stale') and (somente is None or d['id'] in somente)]  # stale repete uma captura já gravada
+        if linhas:
+            self._com_retry("upsert destinos", self.backend.upsert, TABELA_DESTINOS, linhas, "destination_id,captured_at")
+
+        latest = {
+            "captured_at": captured_at,
+            "run_id": run_id,
+            "payload": {
+                "destinations": [formatar_para_dashboard(d) for d in final_data],
+                "top_3_ranking": ranking
+            }
+        }
+        self._com_retry("snapshot latest", self.backend.upsert, TABELA_SNAPSHOTS, [latest], "run_id")
+
+def criar_storage() -> Optional[PulseStorage]:
+    """PULSE_STORAGE=sqlite:<arquivo> usa o stand-in; senão Supabase, se configurado."""
+    if STORAGE_URL.startswith('sqlite:'):
+        return PulseStorage(SqliteBackend(STORAGE_URL[len('sqlite:'):]))
+    if SUPABASE_ENABLED:
+        return PulseStorage(SupabaseBackend(cliente_supabase()))
+    return None
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def coletar(destinos: List[Dict], journal: CheckpointJournal, resume: bool = False,
+            fresh_hours: Optional[float] = None) -> Dict:
+    """
+    Etapa de coleta: journal/--resume/--fresh-hours, lotes, clima e destinos
+    em paralelo. Devolve resultados brutos (sem métricas) e quais ids foram
+    coletados nesta execução.
+    """
+    resultados = {}
+    novos = []
+    falhas = []
+    adiados = []
+    
+    # CHECKPOINTS
+    if resume and journal.ultimo_run_id and journal.ultimo_run_id not in journal.concluidas:
+        run_id = journal.ultimo_run_id
+        resultados.update(journal.concluidos(run_id))
+        novos.extend(resultados)
+        print(f"♻️  Retomando {run_id}: {len(resultados)} destinos já concluídos")
+    else:
+        run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+        journal.compactar()
+        if ARQUIVO_DIAS:
+            ARQUIVO.podar(ARQUIVO_DIAS)
+    if fresh_hours is not None:
+        recentes = {i: d for i, d in journal.recentes(fresh_hours).items() if i not in resultados}
+        resultados.update(recentes)
+        print(f"🕒 {len(recentes)} destinos atualizados há menos de {fresh_hours:g}h, reaproveitados")
+    
+    reaproveitados = len(resultados) - len(novos)
+    pendentes = priorizar([d for d in destinos if d['id'] not in resultados], carregar_anteriores())
+    print(f"🎯 A coletar: {len(pendentes)}/{len(destinos)}")
+    if PRAZO.fim is not None:
+        print(f"⏳ Prazo: {PRAZO.restante() / 60:.1f} min para coletar (prioridade: {', '.join(d['id'] for d in pendentes[:3])}...)")
+    
+    # Comparações em lote: ~1 chamada SERP a cada 4 keywords (+ origens por keyword, em cache semanal)
+    coletas = coletar_trends_em_lote(pendentes) if BATCH_MODE and pendentes else {}
+    
+    # Clima: uma requisição Open-Meteo para todos os destinos
+    clima = get_weather_batch(pendentes) if pendentes else {}
+    
+    # Destinos em paralelo; o ritmo fica a cargo dos RATE_LIMITERS
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(coletar_destino, destino, coletas.get(destino['id']), clima.get(destino['id'])): destino for destino in pendentes}
         
-        if idx < len(DESTINOS):
-            delay = random.uniform(10, 15)
-            print(f"\n   ⏸️  Aguardando {delay:.1f}s...")
-            time.sleep(delay)
+        for future in as_completed(futures):
+            destino = futures[future]
+            try:
+                destino_data = future.result()
+                journal.registrar(run_id, destino_data)
+                resultados[destino['id']] = destino_data
+                novos.append(destino['id'])
+                print(f"\n   ✅ SUCESSO [{destino['nome']}]: {len(destino_data['timeline'])} pontos")
+            except CircuitOpenError:
+                # Sem chave/saldo/API nada mais vai dar certo: para já.
+                # O journal guarda o que concluiu; --resume continua depois.
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except PrazoExcedido:
+                adiados.append(destino['id'])
+                print(f"\n   ⏳ ADIADO [{destino['nome']}]: sem tempo no prazo")
+            except Exception as e:
+                falhas.append(destino['id'])
+                print(f"\n   ❌ FALHA [{destino['nome']}]: {str(e)}")
     
     # RESUMO
+    total = len(destinos)
     print("\n" + "="*70)
     print("📊 RESUMO FINAL:")
-    print(f"   ✅ SUCESSO: {destinos_sucesso}/{len(DESTINOS)}")
-    print(f"   ❌ FALHA: {destinos_falha}/{len(DESTINOS)}")
-    print(f"   📈 TAXA: {(destinos_sucesso/len(DESTINOS))*100:.0f}%")
+    print(f"   🗃️  CACHE: {RESPONSE_CACHE.hits} hits / {RESPONSE_CACHE.misses} misses")
+    print(f"   ♻️  REAPROVEITADOS: {reaproveitados}/{total}")
+    print(f"   ✅ SUCESSO: {len(resultados)}/{total}")
+    print(f"   ❌ FALHA: {len(falhas)}/{total}")
+    if adiados:
+        print(f"   ⏳ ADIADOS (prazo): {len(adiados)}/{total}")
+    print(f"   📈 TAXA: {(len(resultados)/total)*100:.0f}%")
     print("="*70 + "\n")
     
-    if not final_data:
+    return {"run_id": run_id, "resultados": resultados, "novos": novos, "falhas": falhas, "adiados": adiados}
+
+def publicar(resultados: Dict[str, Dict], novos: List[str], destinos: List[Dict], run_id: str,
+             parcial: bool = False) -> List[Dict]:
+    """
+    Etapa de publicação: histórico, métricas em lote, backup e Supabase.
+    Roda uma vez por execução (ou no merge dos shards, ou a cada rodada do
+    serviço — `parcial`: só os `novos` viram linha de histórico no storage).
+    Devolve os registros publicados, na ordem do registro.
+    """
+    if not resultados:
         print("❌ CRÍTICO: Zero dados coletados!")
         print("💡 Verificar: 1) SERP API 2) Saldo 3) Zona\n")
-        return
+        return []
+    
+    # SNAPSHOT CONSISTENTE: quem ficou de fora (prazo, falha) repete o último
+    # valor publicado, marcado como stale; os coletados agora saem stale=False
+    for registro in resultados.values():
+        registro['stale'] = False
+    anteriores = carregar_anteriores()
+    repetidos = 0
+    for destino in destinos:
+        if destino['id'] not in resultados and destino['id'] in anteriores:
+            resultados[destino['id']] = {**anteriores[destino['id']], "stale": True}
+            repetidos += 1
+    if repetidos:
+        print(f"♻️  {repetidos} destinos com o valor anterior (stale)")
+    
+    # HISTÓRICO: referência do z-score sem a janela atual; depois registra
+    # só o que foi coletado nesta execução
+    historico = HistoryStore()
+    referencia = historico.estatisticas(list(resultados))
+    for destino_id in novos:
+        historico.registrar(resultados[destino_id])
+    
+    # MÉTRICAS: todos os destinos numa passada (inclui os reaproveitados)
+    with TELEMETRIA.span('metrics', destinos=len(resultados)):
+        aplicar_metricas(resultados, referencia)
+    
+    # Mantém a ordem do registro no backup
+    final_data = [resultados[d['id']] for d in destinos if d['id'] in resultados]
     
     # BACKUP
     backup_data = {d['id']: d for d in final_data}
-    with open('pulse-data-backup.json', 'w', encoding='utf-8') as f:
+    with open(BACKUP_PATH, 'w', encoding='utf-8') as f:
         json.dump(backup_data, f, ensure_ascii=False, indent=2)
     print(f"💾 Backup: {len(final_data)} destinos\n")
     
+    sorted_data = sorted(final_data, key=lambda x: x['crescimento'], reverse=True)
+    
+    # SNAPSHOT ESTÁTICO
+    with TELEMETRIA.span('publish', destino='estatico') as span:
+        publicado = publicar_snapshot(final_data, [d['id'] for d in sorted_data[:3]])
+        span['bytes'] = sum(os.path.getsize(p) for p in [publicado['index'], publicado['origens'], *publicado['shards']])
+    
     # SUPABASE
-    if SUPABASE_ENABLED and final_data:
+    storage = criar_storage()
+    if storage and final_data:
         try:
-            sorted_data = sorted(final_data, key=lambda x: x['crescimento'], reverse=True)
-            payload = {
-                "data": backup_data,
-                "metadata": {
-                    "total_destinos": len(final_data),
-                    "top_3_ranking": [d['id'] for d in sorted_data[:3]],
-                    "ultima_atualizacao": datetime.now().isoformat(),
-                    "versao": "v7.0-serp-api-definitiva",
-                    "taxa_sucesso": f"{(destinos_sucesso/len(DESTINOS))*100:.0f}%"
-                }
-            }
-            supabase.table('pulse_snapshots').insert(payload).execute()
-            print("📤 Supabase: OK!\n")
+            with TELEMETRIA.span('publish', destino='storage', linhas=len(final_data)):
+                storage.salvar_execucao(run_id, final_data, [d['id'] for d in sorted_data[:3]],
+                                        somente=set(novos) if parcial else None)
+            print(f"📤 Storage: {len(novos) if parcial else len(final_data)} destinos + snapshot latest\n")
         except Exception as e:
-            print(f"⚠️  Supabase: {str(e)[:80]}\n")
+            print(f"⚠️  Storage: {str(e)[:80]}\n")
+    return final_data
+
+def imprimir_cabecalho(destinos: List[Dict], titulo: str = ""):
+    print("\n" + "="*70)
+    print(f"🚀 DEMAND PULSE v7.0 - SERP API (SOLUÇÃO DEFINITIVA){titulo}")
+    print("="*70)
+    print(f"📍 Destinos: {len(destinos)}")
+    print(f"🔑 API: SERP API (especializada Google)")
+    print(f"🌐 Zone: {BRIGHT_DATA_ZONE}")
+    print(f"💰 Custo: $1.50/CPM (~$1.35/mês)")
+    print(f"⏱️  Timeout: {SERP_TIMEOUT_MIN:.0f}-{SERP_TIMEOUT_MAX:.0f}s adaptativo | Retries: 3x por requisição, {SERP_RETRY_BUDGET} por execução")
+    print(f"🧵 Workers: {MAX_WORKERS} | SERP: {RATE_LIMITERS['serp'].taxa} req/s")
+    print(f"📦 Lote: {'ativo' if BATCH_MODE else 'desativado'}")
+    print(f"⚠️  SEM DADOS SINTÉTICOS: falha repete o último valor real (stale)")
+    print("="*70 + "\n")
+
+def main(resume: bool = False, fresh_hours: Optional[float] = None, prazo: Optional[float] = None):
+    PRAZO.definir(prazo)
+    imprimir_cabecalho(DESTINOS)
+    
+    journal = CheckpointJournal()
+    if resume and journal.ultima_concluida():
+        return
+    coleta = coletar(DESTINOS, journal, resume=resume, fresh_hours=fresh_hours)
+    publicar(coleta['resultados'], coleta['novos'], DESTINOS, coleta['run_id'])
+    journal.concluir(coleta['run_id'])
+    TELEMETRIA.imprimir_resumo()
     
     print("="*70)
     print("🎉 CONCLUÍDO!")
     print("="*70)
 
+# ============================================================================
+# SHARDS (coleta horizontal + merge)
+# ============================================================================
+
+SHARDS_DIR = os.environ.get('PULSE_SHARDS_DIR', 'shards')
+
+def shard_path(indice: int, total: int) -> str:
+    return os.path.join(SHARDS_DIR, f"pulse-shard-{indice}-of-{total}.json")
+
+def main_shard(indice: int, total: int, resume: bool = False, fresh_hours: Optional[float] = None,
+               prazo: Optional[float] = None) -> str:
+    """
+    Coleta só o shard `indice` de `total` (processo ou job próprio) e grava
+    o resultado bruto em shards/. Publicação fica para o merge.
+    """
+    PRAZO.definir(prazo)
+    destinos = REGISTRY.shard(indice, total)
+    imprimir_cabecalho(destinos, f" [shard {indice}/{total}]")
+    
+    # Journal próprio por shard: processos diferentes não disputam o arquivo
+    base, ext = os.path.splitext(CHECKPOINT_PATH)
+    journal = CheckpointJournal(f"{base}.shard-{indice}-of-{total}{ext}")
+    path = shard_path(indice, total)
+    if resume and journal.ultima_concluida() and os.path.exists(path):
+        return path
+    coleta = coletar(destinos, journal, resume=resume, fresh_hours=fresh_hours)
+    
+    os.makedirs(SHARDS_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "shard": indice, "total": total, "run_id": coleta['run_id'],
+            "gerado_em": datetime.now().isoformat(),
+            "novos": coleta['novos'], "falhas": coleta['falhas'], "adiados": coleta['adiados'],
+            "destinos": coleta['resultados']
+        }, f, ensure_ascii=False)
+    journal.concluir(coleta['run_id'])
+    print(f"🧩 Shard gravado: {path} ({len(coleta['resultados'])} destinos)")
+    TELEMETRIA.imprimir_resumo()
+    return path
+
+def main_merge(paths: Optional[List[str]] = None):
+    """Junta os shards num snapshot único e publica (backup, ranking, Supabase)."""
+    paths = paths or sorted(glob.glob(os.path.join(SHARDS_DIR, 'pulse-shard-*.json')))
+    print(f"🧩 Merge de {len(paths)} shards")
+    
+    resultados, novos, vistos, run_ids = {}, [], set(), []
+    total = None
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            shard = json.load(f)
+        if total is not None and shard['total'] != total:
+            raise ValueError(f"Shards de particionamentos diferentes: {path}")
+        total = shard['total']
+        vistos.add(shard['shard'])
+        resultados.update(shard['destinos'])
+        novos.extend(shard['novos'])
+        run_ids.append(shard['run_id'])
+    
+    if total is not None and len(vistos) < total:
+        faltando = sorted(set(range(total)) - vistos)
+        print(f"⚠️  Shards ausentes: {faltando} — snapshot parcial")
+    
+    # Uma execução lógica: leva o run_id mais recente entre os shards
+    publicar(resultados, novos, DESTINOS, max(run_ids, default=datetime.now().strftime('%Y%m%dT%H%M%S')))
+    TELEMETRIA.imprimir_resumo()
+    print(f"🎉 MERGE CONCLUÍDO: {len(resultados)}/{len(DESTINOS)} destinos")
+
+def _init_worker(total: int):
+    # Cada processo tem seus buckets; divide a taxa para respeitar o limite global
+    for bucket in RATE_LIMITERS.values():
+        bucket.taxa /= total
+        bucket.capacidade = max(1, bucket.capacidade / total)
+        bucket._tokens = min(bucket._tokens, bucket.capacidade)
+
+def main_processos(total: int, resume: bool = False, fresh_hours: Optional[float] = None,
+                   prazo: Optional[float] = None):
+    """Roda os `total` shards em processos locais e faz o merge no fim."""
+    with ProcessPoolExecutor(max_workers=total, initializer=_init_worker, initargs=(total,)) as executor:
+        futures = [executor.submit(main_shard, k, total, resume, fresh_hours, prazo) for k in range(total)]
+        paths = []
+        for future in as_completed(futures):
+            try:
+                paths.append(future.result())
+            except CircuitOpenError:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            except Exception as e:
+                print(f"❌ Shard falhou: {str(e)[:100]}")
+    main_merge(sorted(paths))
+
+# ============================================================================
+# REPARSE (snapshots refeitos a partir do arquivo bruto, sem rede)
+# ============================================================================
+
+REPARSE_DIR = os.environ.get('PULSE_REPARSE_DIR', 'reparse')
+
+def _reparse_entrada(entrada: Dict) -> Optional[Dict]:
+    """Roda no pool de processos: lê o corpo arquivado e extrai a comparação."""
+    try:
+        corpo = ARQUIVO.ler(entrada['sha256'])
+        if entrada['modo'] == 'geo':
+            geo = extrair_geo_termo(corpo, entrada['termos'][0], 'geo')
+            return {"termos": entrada['termos'], "geo_termo": geo} if geo else None
+        if entrada['modo'] == 'widget':
+            comp = extract_comparison_from_widgets(corpo, entrada['termos'])
+        else:
+            comp = extract_comparison_from_html(corpo, entrada['termos'])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"   ❌ {entrada['sha256'][:12]}: {str(e)[:80]}")
+        return None
+    if comp:
+        comp['payload_sha256'] = entrada['sha256']
+    return comp
+
+def atualizar_geo(geo: Dict[str, Dict], comparacoes: List[Optional[Dict]]):
+    """Consultas de um termo só (página do explore ou comparedgeo) → geo vigente do termo."""
+    for comp in comparacoes:
+        if not comp or len(comp['termos']) != 1:
+            continue
+        termo = comp['termos'][0]
+        if comp.get('geo_termo'):
+            geo[termo] = comp['geo_termo']
+        elif comp.get('geo', {}).get(termo):
+            geo[termo] = {"estado": comp['geo'][termo]}
+
+def reparse_dia(data: str, entradas: List[Dict], comparacoes: List[Optional[Dict]],
+                geo: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Registros de um dia: lotes com âncora reescalados juntos, depois as
+    consultas individuais dos destinos que ficaram de fora. `geo`: origens por termo vigentes (as consultas de
+    um termo só são semanais), atualizado com as do dia.
+    """
+    geo = {} if geo is None else geo
+    atualizar_geo(geo, comparacoes)
+    comparacoes = [c if c and 'series' in c else None for c in comparacoes]
+    # Página de um termo só (geo da própria âncora) não é lote
+    lotes = [c for c in comparacoes if c and BATCH_ANCHOR in c['termos'] and len(c['termos']) > 1]
+    coletas = combinar_lotes(DESTINOS, lotes, geo)
+    # Consultas individuais: com lotes no dia, só as ancoradas (mesma escala);
+    # num dia sem lotes (PULSE_BATCH=0), as autonormalizadas
+    ancora = BATCH_ANCHOR if lotes else None
+    individuais = {tuple(c['termos']): c for c in comparacoes if c and (BATCH_ANCHOR in c['termos']) == bool(lotes)}
+
+    capturado_em = max(e['capturado_em'] for e in entradas)
+    resultados = {}
+    for destino in DESTINOS:
+        coleta = coletas.get(destino['id'])
+        comp = individuais.get(tuple(termos_individuais(destino, ancora)))
+        if coleta is None and comp and ancora:
+            coleta = combinar_lotes([destino], [comp], geo).get(destino['id'])
+        elif coleta is None and comp:
+            coleta = combinar_destino(destino, comp['series'], geo, comp['timestamps'])
+            if coleta:
+                coleta['payload_sha256'] = comp['payload_sha256']
+        if not coleta or not coleta.get('trends') or not coleta.get('origins'):
+            continue
+        # Clima não é arquivado: o snapshot refeito sai sem previsão
+        registro = coletar_destino(destino, coleta, None)
+        registro['ultimaAtualizacao'] = capturado_em
+        resultados[destino['id']] = registro
+    aplicar_metricas(resultados)
+    return resultados
+
+def main_reparse(intervalo: str = '', processos: Optional[int] = None):
+    """
+    --reparse [DESDE:ATE]: refaz os snapshots diários (reparse/pulse-<data>.json)
+    a partir do arquivo bruto com o parser atual, em paralelo e sem rede.
+    DESDE sozinho = só aquele dia; DESDE: = de DESDE até hoje; :ATE = até ATE.
+    """
+    desde, dois_pontos, ate = (intervalo or '').partition(':')
+    if not dois_pontos:
+        ate = desde
+    entradas = ARQUIVO.entradas(desde or None, ate or None)
+    if not entradas:
+        print(f"❌ Nada no arquivo {ARQUIVO_DIR!r} para {intervalo or 'todas as datas'}")
+        return
+
+    # Origens vêm de consultas de um termo só, semanais: o primeiro dia usa a
+    # última de cada termo anterior ao intervalo
+    previas = {}
+    if desde:
+        for e in ARQUIVO.entradas(None, None):
+            if e['data'] < desde and len(e['termos']) == 1:
+                previas[e['termos'][0]] = e
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        comparacoes = list(executor.map(_reparse_entrada, list(previas.values()) + entradas, chunksize=16))
+    geo: Dict[str, Dict] = {}
+    atualizar_geo(geo, comparacoes[:len(previas)])
+    comparacoes = comparacoes[len(previas):]
+
+    por_dia: Dict[str, List[int]] = {}
+    for i, entrada in enumerate(entradas):
+        por_dia.setdefault(entrada['data'], []).append(i)
+
+    os.makedirs(REPARSE_DIR, exist_ok=True)
+    with open(os.devnull, 'w') as nulo:
+        for data, indices in sorted(por_dia.items()):
+            with redirect_stdout(nulo):
+                resultados = reparse_dia(data, [entradas[i] for i in indices], [comparacoes[i] for i in indices], geo)
+            path = os.path.join(REPARSE_DIR, f"pulse-{data}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(resultados, f, ensure_ascii=False, indent=2)
+            print(f"   {data}: {len(resultados)}/{len(DESTINOS)} destinos → {path}")
+
+    falhas = sum(1 for c in comparacoes if not c)
+    print(f"🔁 Reparse: {len(entradas)} corpos, {len(por_dia)} dias, {falhas} sem dados, "
+          f"{time.perf_counter() - inicio:.1f}s")
+
+# ============================================================================
+# SERVIÇO (--servir: snapshot em memória + API HTTP local + refresh rolante)
+# ============================================================================
+
+SERVICO_HOST = os.environ.get('PULSE_SERVICO_HOST', '127.0.0.1')
+SERVICO_CICLO_HORAS = float(os.environ.get('PULSE_SERVICO_CICLO_HORAS', '24'))  # todos renovados 1x por ciclo
+SERVICO_LOTE = int(os.environ.get('PULSE_SERVICO_LOTE', str(TRENDS_MAX_TERMOS - 1)))  # destinos por rodada
+SERVICO_LRU = int(os.environ.get('PULSE_SERVICO_LRU', '512'))
+SERVICO_OCIOSO = 30  # s sem requisição antes de fechar a conexão keep-alive
+SERVICO_GZIP_MIN = 1024
+HTTP_STATUS = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed",
+               503: "Service Unavailable"}
+
+class SnapshotMemoria:
+    """
+    Snapshot publicado mantido em memória. Imutável depois de montado: cada
+    rodada de refresh monta outro numa thread e o loop só troca a referência,
+    então uma leitura nunca vê meia atualização.
+    """
+
+    def __init__(self, final_data: List[Dict], versao: int = 0):
+        self.versao = versao
+        self.gerado_em = datetime.now().isoformat()
+        self.destinos = {d['id']: d for d in final_data}
+        ordenados = sorted(final_data, key=lambda d: d.get('crescimento', 0), reverse=True)
+        self.ranking = [d['id'] for d in ordenados]
+        self.indice = montar_indice(final_data, self.ranking[:3])
+        self.origens = indice_origens(final_data)
+
+class RespostaLRU:
+    """
+    Respostas já renderizadas (JSON compacto, gzip e ETag) por rota, LRU de
+    `capacidade` entradas. Só o loop do asyncio mexe nela: sem lock.
+    Esvaziada a cada troca de snapshot.
+    """
+
+    def __init__(self, capacidade: int = SERVICO_LRU):
+        self.capacidade = capacidade
+        self._itens: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave: tuple) -> Optional[Dict]:
+        item = self._itens.get(chave)
+        if item is None:
+            self.misses += 1
+            return None
+        self._itens.move_to_end(chave)
+        self.hits += 1
+        return item
+
+    def put(self, chave: tuple, item: Dict):
+        self._itens[chave] = item
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+
+    def limpar(self):
+        self._itens.clear()
+
+def renderizar(obj) -> Dict:
+    """Corpo JSON + gzip (mtime=0, determinístico) + ETag forte pelo conteúdo."""
+    corpo = _json_compacto(obj)
+    return {
+        "corpo": corpo,
+        "gz": gzip.compress(corpo, compresslevel=6, mtime=0) if len(corpo) >= SERVICO_GZIP_MIN else None,
+        "etag": f'"{hashlib.sha256(corpo).hexdigest()[:16]}"'
+    }
+
+def fila_rolante(destinos: List[Dict], atuais: Dict[str, Dict]) -> List[Dict]:
+    """Ordem do refresh rolante: captura mais antiga primeiro; empate pela prioridade de coleta."""
+    ordem = {d['id']: i for i, d in enumerate(priorizar(destinos, atuais))}
+    return sorted(destinos, key=lambda d: (atuais.get(d['id'], {}).get('ultimaAtualizacao') or '', ordem[d['id']]))
+
+class PulseService:
+    """
+    --servir: API HTTP/1.1 mínima (asyncio, só stdlib) sobre o snapshot em
+    memória, e coleta rolante em segundo plano.
+
+    Rotas (GET/HEAD, JSON):
+        /v1/index                      ranking + resumo (mesmo formato do index.json)
+        /v1/ranking?n=N                top N por crescimento
+        /v1/destinos/<id>              registro compacto do destino
+        /v1/origens/<estado|cidade>/<nome>  top-K destinos da origem (cidade: PULSE_ORIGENS_CIDADE)
+        /healthz                       versão, idade e agenda do refresh (sem cache)
+
+    Respostas saem da RespostaLRU com ETag; If-None-Match igual → 304.
+
+    Refresh: a cada ciclo/ceil(N/lote) coleta os SERVICO_LOTE destinos de
+    captura mais antiga (fila_rolante) numa thread e republica (histórico,
+    métricas, backup, snapshot estático, storage). Assim o gasto SERP se
+    espalha pelo dia e a leitura nunca espera a coleta.
+    """
+
+    def __init__(self, destinos: List[Dict], porta: int, host: str = SERVICO_HOST,
+                 ciclo_horas: float = SERVICO_CICLO_HORAS, lote: int = SERVICO_LOTE):
+        self.destinos = destinos
+        self.host = host
+        self.porta = porta
+        self.lote = max(1, lote)
+        rodadas = max(1, -(-len(destinos) // self.lote))
+        self.intervalo = ciclo_horas * 3600 / rodadas
+        self.snapshot: Optional[SnapshotMemoria] = None
+        self.cache = RespostaLRU()
+        self.journal = CheckpointJournal()
+        self.em_coleta = False
+        self.proximo_refresh: Optional[float] = None
+        self.ultimo_erro: Optional[str] = None
+
+    # ---------------------------------------------------------------- leitura
+
+    def trocar_snapshot(self, final_data: List[Dict]):
+        if not final_data:
+            return
+        versao = self.snapshot.versao + 1 if self.snapshot else 1
+        self.snapshot = SnapshotMemoria(final_data, versao)
+        self.cache.limpar()
+
+    def _conteudo(self, caminho: str, consulta: Dict[str, str]):
+        """Objeto da rota, ou None (404)."""
+        snap = self.snapshot
+        partes = [unquote(p) for p in caminho.split('/') if p]
+        if partes == ['v1', 'index']:
+            return snap.indice
+        if partes == ['v1', 'ranking']:
+            try:
+                n = min(max(int(consulta.get('n', 10)), 1), len(snap.ranking))
+            except ValueError:
+                n = 10
+            return [{k: snap.destinos[i].get(k) for k in CAMPOS_INDICE} for i in snap.ranking[:n]]
+        if len(partes) == 3 and partes[:2] == ['v1', 'destinos'] and partes[2] in snap.destinos:
+            return compactar_destino(snap.destinos[partes[2]])
+        if len(partes) == 4 and partes[:2] == ['v1', 'origens']:
+            return snap.origens.get(partes[2], {}).get(partes[3])
+        return None
+
+    def responder(self, caminho: str, headers: Dict[str, str]) -> tuple:
+        """(status, headers, corpo) para um GET; sem E/S, roda direto no loop."""
+        alvo = urlsplit(caminho)
+        if alvo.path == '/healthz':
+            return 200, {"Cache-Control": "no-store"}, _json_compacto(self.saude())
+        if self.snapshot is None:
+            return 503, {"Retry-After": "60"}, _json_compacto({"erro": "primeira coleta em andamento"})
+
+        consulta = dict(parse_qsl(alvo.query))
+        chave = (alvo.path, consulta.get('n') if alvo.path.rstrip('/') == '/v1/ranking' else None)
+        item = self.cache.get(chave)
+        if item is None:
+            conteudo = self._conteudo(alvo.path, consulta)
+            if conteudo is None:
+                return 404, {}, _json_compacto({"erro": "não encontrado"})
+            item = renderizar(conteudo)
+            self.cache.put(chave, item)
+
+        extras = {"ETag": item['etag'], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        candidatas = {e.strip() for e in headers.get('if-none-match', '').split(',')}
+        if item['etag'] in candidatas or '*' in candidatas:
+            return 304, extras, b""
+        if item['gz'] is not None and 'gzip' in headers.get('accept-encoding', ''):
+            return 200, {**extras, "Content-Encoding": "gzip"}, item['gz']
+        return 200, extras, item['corpo']
+
+    def saude(self) -> Dict:
+        snap = self.snapshot
+        return {
+            "versao": snap.versao if snap else None,
+            "gerado_em": snap.gerado_em if snap else None,
+            "destinos": len(snap.destinos) if snap else 0,
+            "stale": sum(1 for d in snap.destinos.values() if d.get('stale')) if snap else 0,
+            "em_coleta": self.em_coleta,
+            "proximo_refresh": datetime.fromtimestamp(self.proximo_refresh).isoformat() if self.proximo_refresh else None,
+            "intervalo_s": round(self.intervalo, 1),
+            "lote": self.lote,
+            "ultimo_erro": self.ultimo_erro,
+            "cache": {"itens": len(self.cache._itens), "hits": self.cache.hits, "misses": self.cache.misses}
+        }
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Uma conexão: requisições em sequência (keep-alive) até EOF, Connection: close ou ociosidade."""
+        try:
+            while True:
+                linha = await asyncio.wait_for(reader.readline(), SERVICO_OCIOSO)
+                if not linha.strip():
+                    break
+                metodo, caminho, versao = linha.decode('latin-1').split()
+                headers = {}
+                while True:
+                    h = await asyncio.wait_for(reader.readline(), SERVICO_OCIOSO)
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = h.decode('latin-1').partition(':')
+                    headers[nome.strip().lower()] = valor.strip()
+
+                if metodo in ('GET', 'HEAD'):
+                    status, extras, corpo = self.responder(caminho, headers)
+                else:
+                    status, extras, corpo = 405, {"Allow": "GET, HEAD"}, b""
+                fechar = headers.get('connection', '').lower() == 'close' or versao == 'HTTP/1.0'
+
+                cabecalho = [f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}",
+                             "Content-Type: application/json; charset=utf-8",
+                             f"Content-Length: {len(corpo)}"]
+                cabecalho += [f"{k}: {v}" for k, v in extras.items()]
+                if fechar:
+                    cabecalho.append("Connection: close")
+                writer.write(("\r\n".join(cabecalho) + "\r\n\r\n").encode('latin-1'))
+                if metodo != 'HEAD':
+                    writer.write(corpo)
+                await writer.drain()
+                if fechar:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # ---------------------------------------------------------------- refresh
+
+    def _rodada(self, lote: List[Dict]) -> List[Dict]:
+        """Coleta `lote` e republica tudo (roda numa thread, fora do loop)."""
+        for limpar in (TELEMETRIA.reiniciar, SERP_RETRIES.reiniciar, SERP_BREAKER.fechar, RESPONSE_CACHE.limpar_memo):
+            limpar()
+
+        coleta = coletar(lote, self.journal)
+        # Os não coletados agora seguem valendo até STALE_HORAS; depois disso
+        # publicar() os repete do backup marcados stale
+        limite = (datetime.now() - timedelta(hours=STALE_HORAS)).isoformat()
+        atuais = {
+            i: dict(d) for i, d in (self.snapshot.destinos.items() if self.snapshot else ())
+            if not d.get('stale') and (d.get('ultimaAtualizacao') or '') >= limite
+        }
+        final_data = publicar({**atuais, **coleta['resultados']}, coleta['novos'], self.destinos,
+                              coleta['run_id'], parcial=True)
+        TELEMETRIA.imprimir_resumo()
+        return final_data
+
+    async def renovar(self, lote: List[Dict]):
+        self.em_coleta = True
+        loop = asyncio.get_running_loop()
+        try:
+            print(f"🔄 Refresh: {', '.join(d['id'] for d in lote[:5])}{'...' if len(lote) > 5 else ''}")
+            self.trocar_snapshot(await loop.run_in_executor(None, self._rodada, lote))
+            self.ultimo_erro = None
+        except CircuitOpenError as e:
+            # Segue servindo o último snapshot; a próxima rodada tenta de novo
+            self.ultimo_erro = str(e)
+            print(f"🛑 Refresh interrompido: {e}")
+        except Exception as e:
+            self.ultimo_erro = str(e)[:200]
+            print(f"⚠️  Refresh falhou: {str(e)[:120]}")
+        finally:
+            self.em_coleta = False
+
+    async def _refresh_rolante(self):
+        if self.snapshot is None:
+            # Sem backup: a primeira rodada coleta todos de uma vez
+            await self.renovar(self.destinos)
+        while True:
+            self.proximo_refresh = time.time() + self.intervalo
+            await asyncio.sleep(self.intervalo)
+            atuais = self.snapshot.destinos if self.snapshot else {}
+            await self.renovar(fila_rolante(self.destinos, atuais)[:self.lote])
+
+    async def executar(self):
+        self.trocar_snapshot(list(carregar_anteriores().values()))
+        servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        self.porta = servidor.sockets[0].getsockname()[1]
+        print(f"🌐 Servindo em http://{self.host}:{self.porta}/v1/index "
+              f"({len(self.snapshot.destinos) if self.snapshot else 0} destinos em memória)")
+        print(f"🔄 Refresh rolante: {self.lote} destinos a cada {self.intervalo / 60:.1f} min "
+              f"(ciclo de {self.intervalo * -(-len(self.destinos) // self.lote) / 3600:g}h)")
+        async with servidor:
+            await asyncio.gather(servidor.serve_forever(), self._refresh_rolante())
+
+def main_servir(porta: int):
+    imprimir_cabecalho(DESTINOS, " - SERVIÇO")
+    try:
+        asyncio.run(PulseService(DESTINOS, porta).executar())
+    except KeyboardInterrupt:
+        print("\n👋 Serviço encerrado")
+
+# ============================================================================
+# BACKFILL (histórico longo por janelas date= sobrepostas, retomável)
+# ============================================================================
+
+BACKFILL_DIR = os.environ.get('PULSE_BACKFILL_DIR', 'backfill')
+BACKFILL_ANOS = 5
+# Janelas de até ~5 anos mantêm pontos semanais; 1 ano dá mais resolução
+# aos inteiros 0-100 do Trends e a sobreposição ancora a costura
+BACKFILL_JANELA_DIAS = int(os.environ.get('PULSE_BACKFILL_JANELA_DIAS', '365'))
+BACKFILL_SOBREPOSICAO_DIAS = int(os.environ.get('PULSE_BACKFILL_SOBREPOSICAO_DIAS', '91'))
+PONTOS_ANO = 52
+
+def janelas_backfill(desde: datetime, ate: datetime, janela_dias: int = BACKFILL_JANELA_DIAS,
+                     sobreposicao_dias: int = BACKFILL_SOBREPOSICAO_DIAS) -> List[str]:
+    """
+    Períodos `date=` ("YYYY-MM-DD YYYY-MM-DD") cobrindo [desde, ate], em ordem
+    cronológica. A última termina em `ate` (mesma base da coleta diária);
+    cada uma sobrepõe a seguinte em `sobreposicao_dias`. Todas têm o mesmo
+    tamanho, então a resolução (semanal) é a mesma em todas.
+    """
+    if sobreposicao_dias >= janela_dias:
+        raise ValueError("sobreposição precisa ser menor que a janela")
+    janelas = []
+    fim = ate
+    while True:
+        inicio = fim - timedelta(days=janela_dias)
+        if inicio <= desde:
+            inicio = min(desde, ate - timedelta(days=janela_dias))
+            janelas.append((inicio, inicio + timedelta(days=janela_dias)))
+            break
+        janelas.append((inicio, fim))
+        fim = inicio + timedelta(days=sobreposicao_dias)
+    return [f"{i:%Y-%m-%d} {f:%Y-%m-%d}" for i, f in reversed(janelas)]
+
+def _bloco_path(termos: List[str], periodo: str) -> str:
+    chave = hashlib.sha1(json.dumps([termos, periodo], ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(BACKFILL_DIR, 'blocos', f"{chave}.json")
+
+def baixar_bloco(termos: List[str], periodo: str) -> bool:
+    """
+    Uma janela de um grupo: explore com date= (1 chamada SERP) → blocos/<hash>.json.
+    Sem cache de respostas nem arquivo bruto: o bloco gravado já é o ponto de
+    retomada, e centenas de páginas no memo só ocupariam memória.
+    """
+    path = _bloco_path(termos, periodo)
+    if os.path.exists(path):
+        return True
+    try:
+        html = serp_api_request(build_explore_url(",".join(termos), periodo), timeout=90)
+        with TELEMETRIA.span('parse', termos=len(termos), bytes=len(html or ''), fonte='html', periodo=periodo) as span:
+            comp = extract_comparison_from_html(html, termos)
+            span['ok'] = comp is not None
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        print(f"      ❌ {periodo} {termos}: {str(e)[:100]}")
+        return False
+    if not comp or None in comp['timestamps']:
+        return False
+
+    bloco = {"termos": termos, "periodo": periodo,
+             "timestamps": [int(t) for t in comp['timestamps']], "series": comp['series']}
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(bloco, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return True
+
+def costurar_janelas(blocos: List[Dict], ancora: str = BATCH_ANCHOR) -> Optional[Dict]:
+    """
+    Janelas de um grupo (mesmos termos, ordem cronológica) → série contínua
+    por termo.
+
+    Cada janela vem na própria escala (máximo da janela = 100). Da mais
+    recente para trás, cada janela vai para a escala da seguinte pela razão
+    das somas nos pontos em comum, somando todos os termos para diluir o
+    arredondamento dos inteiros. Nos pontos sobrepostos vale a janela mais
+    recente. No fim a âncora fica com média ANCORA_MEDIA no último ano,
+    a mesma escala de reescalar_lotes na coleta diária.
+    Sem sobreposição utilizável a costura para ali (fica só o trecho recente).
+    """
+    termos = blocos[-1]['termos']
+    pontos = [np.asarray(b['timestamps'], dtype='<i8') for b in blocos]
+    valores = [np.column_stack([b['series'][t] for t in termos]).astype(float) for b in blocos]
+
+    # Referência = janela seguinte inteira, já na escala da mais recente
+    ref_pontos, ref_valores = pontos[-1], valores[-1]
+    pontos_costurados, valores_costurados = [ref_pontos], [ref_valores]
+    primeiro = ref_pontos[0]
+    for i in range(len(blocos) - 2, -1, -1):
+        _, idx_antiga, idx_nova = np.intersect1d(pontos[i], ref_pontos, return_indices=True)
+        soma_antiga = valores[i][idx_antiga].sum()
+        if len(idx_antiga) == 0 or soma_antiga <= 0:
+            print(f"      ⚠️  {blocos[i]['periodo']}: sem sobreposição utilizável, costura até {blocos[i + 1]['periodo']}")
+            break
+        ref_pontos, ref_valores = pontos[i], valores[i] * (ref_valores[idx_nova].sum() / soma_antiga)
+        so_antigos = ref_pontos < primeiro
+        pontos_costurados.append(ref_pontos[so_antigos])
+        valores_costurados.append(ref_valores[so_antigos])
+        primeiro = min(primeiro, ref_pontos[0])
+
+    pontos_finais = np.concatenate(pontos_costurados[::-1])
+    valores_finais = np.concatenate(valores_costurados[::-1])
+    if ancora in termos:
+        media = valores_finais[-PONTOS_ANO:, termos.index(ancora)].mean()
+        if media <= 0:
+            print(f"      ⚠️  Âncora zerada no backfill de {termos}, grupo descartado")
+            return None
+        valores_finais = valores_finais * (ANCORA_MEDIA / media)
+    return {
+        "termos": termos,
+        "timestamps": pontos_finais.tolist(),
+        "series": {t: np.round(valores_finais[:, j], 1).tolist() for j, t in enumerate(termos)}
+    }
+
+def main_backfill(intervalo: str = '', ids: Optional[List[str]] = None):
+    """
+    --backfill [DESDE:ATE]: histórico semanal longo (padrão: últimos 5 anos)
+    para o HistoryStore. Cada grupo de planejar_lotes é buscado em janelas
+    sobrepostas (janelas_backfill) em paralelo, no ritmo do rate limit SERP;
+    cada bloco concluído fica em backfill/blocos, então rodar de novo só busca
+    o que faltou. Grupos completos são costurados e gravados; pontos que o
+    histórico já tem (coleta diária) são mantidos.
+    """
+    desde_txt, _, ate_txt = (intervalo or '').partition(':')
+    hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    ate = datetime.strptime(ate_txt, '%Y-%m-%d') if ate_txt else hoje
+    desde = datetime.strptime(desde_txt, '%Y-%m-%d') if desde_txt else ate - timedelta(days=365 * BACKFILL_ANOS)
+
+    destinos = [d for d in DESTINOS if not ids or d['id'] in ids]
+    if not destinos:
+        print(f"❌ Nenhum destino com id em {ids}")
+        return
+    grupos = planejar_lotes(destinos)
+    janelas = janelas_backfill(desde, ate)
+    os.makedirs(os.path.join(BACKFILL_DIR, 'blocos'), exist_ok=True)
+
+    blocos = [(g, j) for g in grupos for j in janelas]
+    pendentes = [(g, j) for g, j in blocos if not os.path.exists(_bloco_path(g, j))]
+    print(f"🗂️  Backfill {desde:%Y-%m-%d} → {ate:%Y-%m-%d}: {len(destinos)} destinos, {len(grupos)} grupos × "
+          f"{len(janelas)} janelas = {len(blocos)} blocos ({len(blocos) - len(pendentes)} já baixados)")
+
+    inicio = time.perf_counter()
+    falhas = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(baixar_bloco, g, j) for g, j in pendentes]
+        try:
+            for n, future in enumerate(as_completed(futures), 1):
+                falhas += not future.result()
+                if n % 50 == 0:
+                    print(f"   {n}/{len(pendentes)} blocos ({time.perf_counter() - inicio:.0f}s)")
+        except CircuitOpenError as e:
+            for f in futures:
+                f.cancel()
+            print(f"🛑 Backfill interrompido: {e}")
+            print(f"   Blocos concluídos ficaram em {BACKFILL_DIR}/blocos; rode de novo para retomar.")
+            raise SystemExit(2)
+    print(f"📥 {len(pendentes) - falhas} blocos baixados, {falhas} falharam ({time.perf_counter() - inicio:.1f}s)")
+
+    # Costura por grupo; a âncora aparece em todos, vale a do primeiro
+    series, pontos = {}, {}
+    incompletos = 0
+    for grupo in grupos:
+        paths = [_bloco_path(grupo, j) for j in janelas]
+        if not all(os.path.exists(p) for p in paths):
+            incompletos += 1
+            continue
+        blocos_grupo = []
+        for p in paths:
+            with open(p, 'r', encoding='utf-8') as f:
+                blocos_grupo.append(json.load(f))
+        costurada = costurar_janelas(blocos_grupo)
+        if not costurada:
+            continue
+        for termo in grupo:
+            if termo not in series:
+                series[termo] = costurada['series'][termo]
+                pontos[termo] = costurada['timestamps']
+
+    historico = HistoryStore()
+    gravados = 0
+    for destino in destinos:
+        kws = destino['keywords']
+        if not all(kw in series for kw in kws):
+            print(f"   ⚠️  {destino['id']}: grupo incompleto, rode de novo")
+            continue
+        por_ponto = {}
+        for kw in kws:
+            for t, v in zip(pontos[kw], series[kw]):
+                por_ponto.setdefault(t, []).append(v)
+        existentes = set(historico.serie(destino['id'])[0].tolist())
+        novos = sorted(t for t, vs in por_ponto.items() if len(vs) == len(kws) and t not in existentes)
+        if novos:
+            historico.registrar({"id": destino['id'], "timelineTimes": novos,
+                                 "timeline": [round(sum(por_ponto[t]), 1) for t in novos]})
+            gravados += 1
+        print(f"   {destino['id']}: {len(novos)} pontos novos ({len(por_ponto)} costurados)")
+
+    print(f"✅ Backfill: {gravados} destinos com histórico novo em {HISTORY_DIR}"
+          f"{f', {incompletos} grupos incompletos' if incompletos else ''}")
+    TELEMETRIA.imprimir_resumo()
+
+def _shard_arg(valor: str) -> tuple:
+    try:
+        indice, total = (int(x) for x in valor.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("use K/N, ex.: 0/4")
+    if not 0 <= indice < total:
+        raise argparse.ArgumentTypeError("K deve estar entre 0 e N-1")
+    return indice, total
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DEMAND PULSE - coleta diária")
+    parser.add_argument('--resume', action='store_true',
+                        help="continua a última execução, pulando destinos já gravados no journal")
+    parser.add_argument('--fresh-hours', type=float, default=None, metavar='N',
+                        help="pula destinos atualizados há menos de N horas")
+    parser.add_argument('--prazo', type=float, default=None, metavar='MIN',
+                        help="prazo total da execução em minutos; o que não couber repete o valor anterior (stale)")
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument('--shard', type=_shard_arg, metavar='K/N',
+                      help="coleta só o shard K de N e grava em shards/ (sem publicar)")
+    modo.add_argument('--merge', nargs='*', metavar='SHARD',
+                      help="junta os arquivos de shard (padrão: shards/*.json) e publica")
+    modo.add_argument('--processos', type=int, metavar='N',
+                      help="coleta em N processos locais (um shard cada) e faz o merge")
+    modo.add_argument('--backfill', nargs='?', const='', metavar='DESDE:ATE',
+                      help="histórico semanal (padrão: 5 anos) por janelas sobrepostas, retomável, para historico/")
+    modo.add_argument('--servir', type=int, nargs='?', const=8080, metavar='PORTA',
+                      help="serviço: API HTTP local sobre o snapshot em memória e refresh rolante (padrão: 8080)")
+    modo.add_argument('--reparse', nargs='?', const='', metavar='DESDE:ATE',
+                      help="refaz snapshots a partir de arquivo/ (datas YYYY-MM-DD; DESDE = um dia, DESDE: = até hoje), sem rede")
+    parser.add_argument('--destinos', type=lambda v: [i for i in v.split(',') if i], metavar='ID,...',
+                        help="restringe --backfill a esses destinos (ex.: um destino recém-adicionado)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    try:
+        if args.shard:
+            main_shard(*args.shard, resume=args.resume, fresh_hours=args.fresh_hours, prazo=args.prazo)
+        elif args.merge is not None:
+            main_merge(args.merge)
+        elif args.reparse is not None:
+            main_reparse(args.reparse)
+        elif args.backfill is not None:
+            main_backfill(args.backfill, args.destinos)
+        elif args.servir is not None:
+            main_servir(args.servir)
+        elif args.processos:
+            main_processos(args.processos, resume=args.resume, fresh_hours=args.fresh_hours, prazo=args.prazo)
+        else:
+            main(resume=args.resume, fresh_hours=args.fresh_hours, prazo=args.prazo)
+    except CircuitOpenError as e:
+        TELEMETRIA.imprimir_resumo()
+        print(f"🛑 EXECUÇÃO INTERROMPIDA: {e}")
+        print("   Concluídos ficaram no journal; corrija e rode com --resume.")
+        raise SystemExit(2)